@@ -15,22 +15,44 @@
 # Date: 2024-06-19
 
 import date_utils as du
+import jwt
 import oidc_utils as oidc
 import os
+import requests
 import streamlit as st
 import streamlit_authenticator as stauth
+import threading
+import time
 import yaml
 
-from auth0.authentication import GetToken
-from auth0.management import Auth0
 from common_utils import app_path, get_configuration, is_configured
 from flask import redirect
+from jwt_utils import verify_id_token
 from loguru import logger
+from metrics_utils import timed
+from mgmt_utils import ManagementClient, get_client_credentials_token
+from session_utils import delete_session, restore_session, save_session
+from session_utils import restore_session_token, set_pending_session_cookie
 from streamlit_oauth import OAuth2Component, StreamlitOauthError
+from token_utils import create_auth_context, discard_session_token
+from token_utils import get_session_token, refresh_session_token
 from urllib.parse import quote_plus, urlencode
-from user_utils import adduser
+from user_utils import adduser, cache_claims, get_cached_claims
 from yaml.loader import SafeLoader
 
+
+# Seconds before expiry at which a cached management token is refreshed
+MGMT_TOKEN_REFRESH_MARGIN = 60
+
+# Process-wide Auth0 Management API clients keyed by oidc_api_provider_key
+_mgmt_api_clients = {}
+_mgmt_api_lock = threading.Lock()
+
+# Process-wide OAuth2Components keyed by oidc_provider_key
+_token_authenticators = {}
+_token_authenticators_lock = threading.Lock()
+
+
 def initialize_creds_authenticator():
     config_file = r'creds_authenticator.yaml'
     auth_config_path = os.path.join(app_path(), config_file)
@@ -63,6 +85,30 @@ def confirm_creds(authenticator):
 
 
 def get_token_authenticator(provider_key):
+    """
+    Returns the OAuth2Component for a provider.
+
+    Authenticators are built once per provider and shared by every session
+    until the provider record changes.
+
+    Args:
+        provider_key (string): The OIDC provider key.
+
+    Returns:
+        OAuth2Component: The token authenticator.
+    """
+    authenticator = _token_authenticators.get(provider_key)
+    if authenticator is None:
+        with _token_authenticators_lock:
+            authenticator = _token_authenticators.get(provider_key)
+            if authenticator is None:
+                authenticator = create_token_authenticator(provider_key)
+                _token_authenticators[provider_key] = authenticator
+
+    return authenticator
+
+
+def create_token_authenticator(provider_key):
     oidc_config = oidc.get_provider_config(provider_key)
     #logger.debug("Initialize token oidc provider...{}", oidc_config)
 
@@ -78,40 +124,91 @@ def get_token_authenticator(provider_key):
     return authenticator
  
 
+def invalidate_provider_caches(provider_key):
+    _token_authenticators.pop(provider_key, None)
+    _mgmt_api_clients.pop(provider_key, None)
+
+
+oidc.on_provider_change(invalidate_provider_caches)
+
+
+@timed('get_auth0_api_authenticator')
 def get_auth0_api_authenticator():
+    """
+    Returns an Auth0 Management API client for the configured API provider.
+
+    The client and its management token are cached for the whole process
+    and reused by every session until the token is about to expire. Only
+    one session fetches a new token, the others wait for it.
+
+    Returns:
+        ManagementClient: The Auth0 Management API client.
+    """
     if is_configured():
         app_config = get_configuration()
-        api_config = oidc.get_provider_config(app_config['oidc_api_provider_key'])
-        #logger.debug("Get Auth0 API authenticator - state...{}", api_config)
+        provider_key = app_config['oidc_api_provider_key']
+
+        cached = _mgmt_api_clients.get(provider_key)
+        if cached is not None and time.time() < cached['refresh_at']:
+            return cached['client']
+
+        with _mgmt_api_lock:
+            # Another session may have refreshed while we waited
+            cached = _mgmt_api_clients.get(provider_key)
+            if cached is None or time.time() >= cached['refresh_at']:
+                cached = create_auth0_api_client(provider_key)
+                _mgmt_api_clients[provider_key] = cached
 
-        api_provider = api_config['config']['provider']
-        api_domain = api_provider['api_domain']
-        api_client_id = api_provider['api_client_id']
-        api_client_secret = api_provider['api_client_secret']
-        api_audience = api_provider['api_audience']
+        return cached['client']
 
-        get_token = GetToken(api_domain, api_client_id, 
-                                client_secret=api_client_secret)
-        token = get_token.client_credentials(api_audience.format(api_domain))
-        mgmt_api_token = token['access_token']
-        
-        return Auth0(api_domain, mgmt_api_token)
 
+def create_auth0_api_client(provider_key):
+    api_config = oidc.get_provider_config(provider_key)
+    #logger.debug("Get Auth0 API authenticator - state...{}", api_config)
 
+    api_provider = api_config['config']['provider']
+    api_domain = api_provider['api_domain']
+    api_client_id = api_provider['api_client_id']
+    api_client_secret = api_provider['api_client_secret']
+    api_audience = api_provider['api_audience']
+
+    token = get_client_credentials_token(api_domain, api_client_id,
+                                         api_client_secret,
+                                         api_audience.format(api_domain))
+    mgmt_api_token = token['access_token']
+
+    expires_in = token.get('expires_in', 0)
+    refresh_in = max(expires_in - MGMT_TOKEN_REFRESH_MARGIN, expires_in / 2)
+    logger.info("Fetched management API token for {}, expires in {}s",
+                provider_key, expires_in)
+
+    return {
+        'client': ManagementClient(api_domain, mgmt_api_token),
+        'refresh_at': time.time() + refresh_in
+    }
+
+
+@timed('login')
 def login():
     if is_configured():
         app_config = get_configuration()
         authenticator = get_token_authenticator(app_config['oidc_provider_key'])
-        logger.debug("Login state...{}", st.session_state)
+        logger.opt(lazy=True).debug("Login state...{}",
+                                    lambda: dict(st.session_state))
         redirect_uri = app_config['redirect_uri']
 
-        if 'token' not in st.session_state:
+        # A login made on another replica or before a reconnect is restored
+        # from the shared session store
+        if 'auth_context' not in st.session_state and restore_session():
+            verify_authentication()
+
+        if 'auth_context' not in st.session_state:
             try:
                 result = authenticator.authorize_button(
                     name='Log in with Auth0',
                     icon='https://cdn.auth0.com/quantum-assets/dist/latest/favicons/auth0-favicon-onlight.png',
                     redirect_uri=redirect_uri,
-                    scope="openid email profile",
+                    scope="openid email profile offline_access",
                     key='authenticator_login',
                     extras_params={"prompt": "consent", "access_type": "offline"}
                 )
@@ -123,9 +220,13 @@ def login():
                     expires_cat = du.convert_epoch(expires_at)
                     logger.debug("Token expires at...{}", expires_cat)
 
-                    st.session_state['token'] = token
-                    verify_authentication()
-                    st.rerun()
+                    st.session_state['auth_context'] = \
+                        create_auth_context(token)
+                    if verify_authentication():
+                        st.rerun()
+                    else:
+                        st.write("Sorry, your login could not be verified. "
+                                 "Please login again.")
 
             except StreamlitOauthError as soe:
                 #if 'authenticator_login' in st.session_state:
@@ -134,6 +235,20 @@ def login():
                 logger.error(soe)
                 st.write("Sorry, your login timed out. Please login again.")
 
+        elif restore_session_token() is None:
+            logger.warning("Session token was evicted from the token cache.")
+            clear_logout_state()
+            st.rerun()
+        elif not refresh_session_token(authenticator):
+            logger.info("Token expired and could not be refreshed.")
+            clear_logout_state()
+            st.rerun()
+        else:
+            # Keeps a refreshed token in the shared session store
+            save_session()
+
+        set_pending_session_cookie()
+
 
 def logout():
     if is_configured():
@@ -142,10 +257,8 @@ def logout():
         logout_endpoint = app_config['logout_endpoint']
         redirect_uri = app_config['redirect_uri']
             
-        if 'token' in st.session_state and st.session_state['token']:
-            id_token = st.session_state['token']['id_token']
-        else:
-            id_token = None
+        token = get_session_token()
+        id_token = token['id_token'] if token else None
         if st.session_state['logout']:
             clear_logout_state()
 
@@ -161,35 +274,65 @@ def logout():
             )
     
 
+@timed('verify_authentication')
 def verify_authentication():
-    
-    if 'token' in st.session_state:       
-        id_token = st.session_state.token['id_token'] 
-        # Verify JWT
-        # Algorithm provided in header throws "InvalidAlgorithmError"
-        #token_header_data = jwt.get_unverified_header(token)
-        #logger.debug("Token header data...{}", token_header_data)
+    """
+    Verifies the id_token in the session and records the user.
+
+    Returns:
+        bool: True if the session holds a verified id_token.
+    """
+    if 'auth_context' in st.session_state:
+        token = restore_session_token()
+        if token is None:
+            logger.warning("Session token was evicted from the token cache.")
+            clear_logout_state()
+            return False
 
-        #jwt.decode(jwt=id_token, key=config['CLIENT_SECRET'], 
-        #           algorithms=["RS256", ])
-        user_record = adduser(id_token)
+        id_token = token['id_token']
+        # Reruns with an id_token verified earlier skip verification and
+        # the user store
+        user_record = get_cached_claims(id_token)
+        if user_record is None:
+            app_config = get_configuration()
+            oidc_config = oidc.get_provider_config(
+                app_config['oidc_provider_key'])
+            try:
+                claims = verify_id_token(id_token, oidc_config['config'])
+            # ValueError covers a JWKS response which is not valid JSON
+            except (jwt.PyJWTError, requests.RequestException,
+                    ValueError) as e:
+                logger.error("Token verification failed...{}", e)
+                clear_logout_state()
+                return False
+
+            user_record = adduser(id_token, claims)
+            cache_claims(id_token, user_record, claims['exp'])
 
         if 'user_record' not in st.session_state:
             st.session_state['user_record'] = user_record
 
+        save_session()
+
         if 'authenticated' not in st.session_state:
             st.session_state['authenticated'] = True
         elif st.session_state['authenticated'] == False:
             st.session_state['authenticated'] = True
 
+        return True
+
+    return False
+
 
 def clear_logout_state():
     #if st.session_state['authenticator_login']:
     #    del st.session_state['authenticator_login']
     if 'user_record' in st.session_state and st.session_state['user_record']:
         del st.session_state['user_record']
-    if 'token' in st.session_state and st.session_state['token']:
-        del st.session_state['token']
+    delete_session()
+    if 'auth_context' in st.session_state:
+        discard_session_token()
+        del st.session_state['auth_context']
     if 'logout' in st.session_state and st.session_state['logout']:
         del st.session_state['logout']
     st.session_state['authenticated'] = False
\ No newline at end of file
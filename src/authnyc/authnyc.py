@@ -19,7 +19,10 @@ import streamlit as st
 
 from common_utils import initialize, is_configured
 from loguru import logger
+from metrics_utils import start_metrics_exporter
 from navigation import make_sidebar
+from profile_utils import profiled
+from warmup_utils import start_warm_up
 
 def main():
     make_sidebar()
@@ -39,5 +42,8 @@ def main():
 
 if __name__ == "__main__":
     initialize(log_level='INFO')
-        
-    main()
\ No newline at end of file
+    start_metrics_exporter()
+    start_warm_up()
+
+    with profiled('authnyc'):
+        main()
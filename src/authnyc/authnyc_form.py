@@ -14,10 +14,12 @@
 # limitations under the License.
 # Date: 2024-07-19
 
+import date_utils as du
 import oidc_utils as oidc
 import streamlit as st
 
 from loguru import logger
+from token_utils import get_session_memory
 
 
 # Workflow form for capturing OIDC Provider details
@@ -79,7 +81,9 @@ def present_authnyc():
         st.session_state['authenticated'] == True:
         st.write(f'Welcome *{st.session_state['user_record']['name']}*')
         st.write('Bringing some :sun_with_face:')
-        st.write(st.session_state['token'])
+        auth_context = st.session_state['auth_context']
+        st.write(f'Session expires at {du.convert_epoch(auth_context.expires_at)}')
+        st.write(f'Session auth state uses {get_session_memory()} bytes')
 
 
 def oidc_discovery_form_clicked():
@@ -18,24 +18,125 @@ import date_utils as du
 import os
 import streamlit as st
 import sys
+import threading
+import time
 import tomlkit
 import uuid
 
+from contextlib import contextmanager
 from dotenv import dotenv_values
 from loguru import logger
-from tinydb import TinyDB, Query
+from store_utils import SQLiteStore, open_tiny_store, write_file_atomically
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+
+# Application document stores and their indexed fields
+STORE_INDEXES = {
+    'user': ('email', 'sub'),
+    'oidc': ('name',),
+    'config': ('name', 'version'),
+}
+
+# Name of the config store record pointing at the current configuration
+CURRENT_CONFIGURATION = 'authnyc_current'
+
+# Default number of configuration versions kept by compaction
+RETAIN_CONFIGURATION_VERSIONS = 5
+
+# Parsed authnyc.toml with the (mtime, inode, size) stamp it was read at
+_base_configuration = (None, None)
+_base_configuration_lock = threading.Lock()
+
+# Serializes configuration writes between threads of this process, the
+# lock file serializes them between processes
+_config_write_lock = threading.Lock()
+
+# Current application configuration with the config_seq it was loaded at
+_configuration = (None, None)
+
+# Defaults for the [logging] section of authnyc.toml
+LOGGING_DEFAULTS = {
+    'file': 'authnyc.log',
+    'max_bytes': 10 * 1024 * 1024,
+    'rotation_hours': 24,
+    'retention': 10,
+    'compression': 'gz',
+    'serialize': True,
+    'enqueue': True,
+}
+
+# Level the log sinks were added at, None until the logger is initialized
+_log_level = None
+_log_lock = threading.Lock()
 
 
 def initialize(log_level):
-    logger.info("Initializing application...")
     initialize_logger(log_level)
+    logger.info("Initializing application...")
 
 
 def initialize_logger(level='DEBUG'):
-    logname = "authnyc.log"
-    log_path = os.path.join(app_path(), logname)
-
-    logger.add(log_path, level=level)
+    """
+    Replaces the default loguru sink with a console sink and a rotating
+    log file configured from the [logging] section of authnyc.toml.
+
+    Records are queued and written by a background thread, so formatting
+    and disk writes stay off the request thread. The file is JSON lines,
+    rotated by size or age and compressed. Calling this again at the same
+    level, as every rerun does, leaves the sinks alone.
+
+    Args:
+        level (string): The minimum level logged.
+    """
+    global _log_level
+
+    with _log_lock:
+        if _log_level == level:
+            return
+
+        log_config = dict(LOGGING_DEFAULTS)
+        log_config.update(get_base_configuration().get('logging', {}))
+        log_path = os.path.join(app_path(), log_config['file'])
+
+        logger.remove()
+        logger.add(sys.stderr, level=level, enqueue=log_config['enqueue'])
+        logger.add(log_path, level=level,
+                   enqueue=log_config['enqueue'],
+                   serialize=log_config['serialize'],
+                   rotation=get_log_rotation(
+                       log_config['max_bytes'],
+                       log_config['rotation_hours'] * 3600),
+                   retention=log_config['retention'],
+                   compression=log_config['compression'] or None)
+        _log_level = level
+
+
+def get_log_rotation(max_bytes, interval, clock=time.time):
+    """
+    Returns a loguru rotation function which rotates the log file once it
+    would grow past max_bytes or interval seconds after the last rotation,
+    as told by clock.
+    """
+    rotate_at = clock() + interval
+
+    def should_rotate(message, file):
+        nonlocal rotate_at
+
+        file.seek(0, 2)
+        now = clock()
+        if now >= rotate_at or file.tell() + len(message) > max_bytes:
+            rotate_at = now + interval
+            return True
+
+        return False
+
+    return should_rotate
 
 
 def is_configured():
@@ -45,62 +146,213 @@ def is_configured():
     return config['oidc_provider_configured']
 
 
-def get_base_configuration():
+def get_base_configuration_path():
     config_file = r'authnyc.toml'
-    config_path = os.path.join(app_path(), config_file)
-    with open(config_path, "rb") as f:
-        authnyc = tomlkit.load(f)
+    return os.path.join(app_path(), config_file)
+
+
+def get_file_stamp(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_ino, stat.st_size)
+
+
+def get_base_configuration():
+    """
+    Returns the parsed authnyc.toml.
+
+    The parsed document is kept in memory and only parsed again when the
+    file's mtime, inode or size changes, so calling this on every rerun
+    costs a stat call. Callers must treat the document as read-only.
+
+    Returns:
+        TOMLDocument: The base configuration.
+    """
+    global _base_configuration
+
+    config_path = get_base_configuration_path()
+    stamp, authnyc = _base_configuration
+    if stamp != get_file_stamp(config_path):
+        with _base_configuration_lock:
+            stamp = get_file_stamp(config_path)
+            if _base_configuration[0] != stamp:
+                with open(config_path, "rb") as f:
+                    _base_configuration = (stamp, tomlkit.load(f))
+                logger.debug("Loaded base configuration...{}", config_path)
+            authnyc = _base_configuration[1]
 
     return authnyc
 
 
+def get_config_seq():
+    """
+    Returns the configuration change sequence number.
+
+    Every configuration write increments config_seq in authnyc.toml, so a
+    worker process can tell that another process committed a new version.
+    """
+    authnyc = get_base_configuration()
+
+    return authnyc['config'].get('config_seq', 0)
+
+
 def update_base_configuration():
-    config_file = r'authnyc.toml'
-    config_path = os.path.join(app_path(), config_file)
-    with open(config_path, "r+") as f:
+    with config_lock():
+        write_base_configuration(set_oidc_provider_configured)
+
+
+def set_oidc_provider_configured(authnyc):
+    #logger.debug("Update app configuration - settings...{}", authnyc)
+    #logger.debug("Update app configuration - state...{}", st.session_state)
+    authnyc['config']['oidc_provider_configured'] =  \
+        st.session_state['oidc_provider_configured']
+
+
+def write_base_configuration(update=None):
+    """
+    Applies an update to authnyc.toml, increments config_seq and replaces
+    the file atomically. The caller must hold config_lock.
+
+    Args:
+        update (callable): Called with the parsed document to change it.
+    """
+    global _base_configuration
+
+    config_path = get_base_configuration_path()
+    with open(config_path, "rb") as f:
         authnyc = tomlkit.load(f)
-        #logger.debug("Update app configuration - settings...{}", authnyc)
-        #logger.debug("Update app configuration - state...{}", st.session_state)
-        f.seek(0)
-        authnyc['config']['oidc_provider_configured'] =  \
-            st.session_state['oidc_provider_configured']
 
-        tomlkit.dump(authnyc, f)
+    if update is not None:
+        update(authnyc)
+    authnyc['config']['config_seq'] = \
+        authnyc['config'].get('config_seq', 0) + 1
+
+    write_file_atomically(config_path, tomlkit.dumps(authnyc))
+    logger.info("Configuration updated, sequence...{}",
+                authnyc['config']['config_seq'])
+
+    with _base_configuration_lock:
+        _base_configuration = (get_file_stamp(config_path), authnyc)
+
+
+@contextmanager
+def config_lock():
+    """
+    Holds the advisory configuration lock, shared by every worker process,
+    while authnyc.toml or the config store is written.
+    """
+    lock_path = get_base_configuration_path() + '.lock'
+    with _config_write_lock, open(lock_path, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
 
 
 def find_configuration():
+    """
+    Finds the current application configuration through the current
+    version pointer.
+
+    Returns:
+        dict: The configuration record or None.
+    """
     config_db = get_config_db()
 
-    Config = Query()
-    config_record = config_db.search(Config.name == 'authnyc')
-    if config_record == []:
-        return None
-    else:
-        config_record = dict(config_record[0])
+    current = config_db.find('name', CURRENT_CONFIGURATION)
+    if current is None:
+        # Saved before configurations were versioned
+        return config_db.find('name', 'authnyc')
+
+    config_record = config_db.find('version', current['current_version'])
 
     return config_record
 
 
-@st.cache_resource
 def get_configuration():
-    config = find_configuration()
-    if config is None:
-        logger.error("Application configuration not found.")
-        sys.exit(1)
+    """
+    Returns the current application configuration.
+
+    The configuration is kept in memory until config_seq changes, which
+    happens whenever any worker process commits a new version.
+    """
+    global _configuration
+
+    config_seq = get_config_seq()
+    loaded_seq, config = _configuration
+    if config is None or loaded_seq != config_seq:
+        # The store may hold versions committed by another worker process
+        get_config_db().reload()
+        config = find_configuration()
+        if config is None:
+            logger.error("Application configuration not found.")
+            sys.exit(1)
+        _configuration = (config_seq, config)
 
     return config
 
 
 @st.cache_resource
 def get_config_db():
-    config_db_file = r'config_db.json'
-    config_db_path = os.path.join(os.getcwd(), config_db_file)
-
-    db = TinyDB(config_db_path)
+    db = open_store('config')
 
     return db
 
 
+def open_store(name, indexes=None):
+    """
+    Opens an application document store with the storage backend selected
+    in authnyc.toml.
+
+    The tinydb backend keeps each store in its own <name>_db.json file. The
+    sqlite backend keeps every store as a table in one WAL mode database.
+    Store specific options are read from the [<name>_store] section.
+
+    Args:
+        name (string): The store name, one of user, oidc or config.
+        indexes (tuple): The document fields to index, defaults to the
+                         fields in STORE_INDEXES.
+
+    Returns:
+        TinyStore | SQLiteStore: The opened store.
+    """
+    if indexes is None:
+        indexes = STORE_INDEXES[name]
+
+    authnyc = get_base_configuration()
+    storage_config = authnyc.get('storage', {})
+    store_config = authnyc.get(f'{name}_store', {})
+    backend = storage_config.get('backend', 'tinydb')
+    fsync = store_config.get('fsync', True)
+
+    if backend == 'sqlite':
+        sqlite_file = storage_config.get('sqlite_file', 'authnyc.db')
+        sqlite_path = os.path.join(os.getcwd(), sqlite_file)
+        logger.info("Opening {} store...{}", name, sqlite_path)
+        return SQLiteStore(sqlite_path, name, indexes=indexes, fsync=fsync)
+
+    if backend == 'tinydb':
+        db_path = os.path.join(os.getcwd(), f'{name}_db.json')
+        logger.info("Opening {} store...{}", name, db_path)
+        return open_tiny_store(
+            db_path, indexes=indexes,
+            atomic_writes=store_config.get('atomic_writes', name == 'config'),
+            write_behind=store_config.get('write_behind', False),
+            flush_size=store_config.get('flush_size', 100),
+            flush_interval=store_config.get('flush_interval', 5.0),
+            fsync=fsync)
+
+    raise ValueError(f"Unknown storage backend {backend}.")
+
+
 def save_configuration():
     config_db = get_config_db()
 
@@ -121,7 +373,61 @@ def save_configuration():
     config['redirect_uri'] = st.session_state['redirect_uri']
     config['logout_endpoint'] = st.session_state['logout_endpoint']
 
-    config_db.insert(config)
+    commit_configuration(config)
+
+
+def commit_configuration(config):
+    """
+    Saves a configuration record as a new version, points the current
+    version at it and compacts versions outside the retention window.
+
+    Args:
+        config (dict): The configuration record.
+
+    Returns:
+        int: The committed version.
+    """
+    global _configuration
+
+    config_db = get_config_db()
+    authnyc = get_base_configuration()
+    retain = authnyc.get('config_store', {}).get(
+        'retain_versions', RETAIN_CONFIGURATION_VERSIONS)
+
+    with config_lock():
+        config_db.reload()
+        current = config_db.find('name', CURRENT_CONFIGURATION)
+        version = current['current_version'] + 1 if current else 1
+
+        config['version'] = version
+        config_db.insert(config)
+        if current is None:
+            config_db.insert({'name': CURRENT_CONFIGURATION,
+                              'current_version': version})
+        else:
+            config_db.update({'current_version': version},
+                             'name', CURRENT_CONFIGURATION)
+
+        compact_configuration(config_db, version, retain)
+
+        # Let other worker processes know a new configuration was saved
+        write_base_configuration()
+        _configuration = (get_config_seq(), config)
+
+    logger.info("Committed configuration version...{}", version)
+
+    return version
+
+
+def compact_configuration(config_db, version, retain):
+    """
+    Removes the configuration versions older than the newest retain
+    versions.
+    """
+    old_version = version - max(retain, 1)
+    while old_version > 0 and config_db.remove('version', old_version):
+        logger.debug("Compacted configuration version...{}", old_version)
+        old_version -= 1
 
 
 @st.cache_resource
@@ -143,6 +449,23 @@ def get_oidc_api_providers():
 
 
 def ensure_clean_start():
+    if 'oidc_discovery_form_submitted' in st.session_state and \
+        'oidc_api_form_submitted' in st.session_state:
+        return
+
+    storage_config = get_base_configuration().get('storage', {})
+    if storage_config.get('backend', 'tinydb') == 'sqlite':
+        # The database may be open, so its tables are emptied rather than
+        # the file removed
+        sqlite_file = storage_config.get('sqlite_file', 'authnyc.db')
+        sqlite_path = os.path.join(os.getcwd(), sqlite_file)
+        if os.path.exists(sqlite_path):
+            for name, indexes in STORE_INDEXES.items():
+                store = SQLiteStore(sqlite_path, name, indexes=indexes)
+                store.clear()
+                store.close()
+        return
+
     # Doesn't work under Windblows
     config_db_file = r'config_db.json'
     config_db_path = os.path.join(os.getcwd(), config_db_file)
@@ -153,12 +476,10 @@ def ensure_clean_start():
 
     db_paths = [config_db_path, user_db_path, oidc_db_path]
 
-    if 'oidc_discovery_form_submitted' not in st.session_state or \
-        'oidc_api_form_submitted' not in st.session_state:
-        for apath in db_paths:
-            if os.path.exists(apath):
-                os.remove(apath)
-    
+    for apath in db_paths:
+        if os.path.exists(apath):
+            os.remove(apath)
+
 
 # Utility method to determine where the application is running from.
 def app_path():
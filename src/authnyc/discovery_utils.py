@@ -0,0 +1,226 @@
+# discovery_utils.py
+# Description: A Streamlit authentication demonstration application
+# Copyright 2024 Michael Konrad
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# Date: 2026-10-18
+
+import hashlib
+import http_utils as http
+import json
+import os
+import threading
+import time
+
+from common_utils import write_file_atomically
+from loguru import logger
+
+
+# Seconds a discovery document is fresh when the response has no max-age
+DEFAULT_DISCOVERY_TTL = 3600
+
+# Minimum seconds a discovery document is fresh, even with no-cache or max-age=0
+DISCOVERY_MIN_TTL = 60
+
+# Seconds before retrying a failed revalidation
+DISCOVERY_RETRY_INTERVAL = 60
+
+# Directory, relative to the working directory, holding last good copies
+DISCOVERY_CACHE_DIR = r'discovery_cache'
+
+# Cached discovery documents keyed by discovery URL
+_discovery_cache = {}
+_discovery_lock = threading.Lock()
+_revalidating = set()
+
+# Callbacks run with the discovery URL whenever a document changes
+_discovery_listeners = []
+
+
+def on_discovery_change(listener):
+    if listener not in _discovery_listeners:
+        _discovery_listeners.append(listener)
+
+
+def get_discovery_document(url):
+    """
+    Returns the discovery document for a URL from the cache.
+
+    A fresh document is returned as is. A stale document, including the
+    last good copy persisted on disk, is returned straight away while it
+    is revalidated in the background. Only a URL which has never been
+    fetched is fetched on the calling thread.
+
+    Args:
+        url (string): The .well-known/openid-configuration URL.
+
+    Returns:
+        dict: The cached discovery document, shared between callers, so it
+            must not be modified.
+    """
+    entry = _discovery_cache.get(url)
+    if entry is None:
+        entry = load_discovery_entry(url)
+        if entry is None:
+            return fetch_discovery_document(url)
+        _discovery_cache[url] = entry
+
+    if time.time() >= entry['expires_at']:
+        revalidate_in_background(url)
+
+    return entry['document']
+
+
+def fetch_discovery_document(url):
+    """
+    Fetches or revalidates a discovery document, sending the cached ETag
+    in If-None-Match. If the provider fails and a copy is cached, the
+    cached copy is kept and returned.
+
+    Returns:
+        dict: The cached discovery document, shared between callers, so it
+            must not be modified.
+    """
+    entry = get_cached_entry(url)
+
+    try:
+        response = http.get(url, headers=get_revalidation_headers(entry))
+        entry = apply_discovery_response(url, entry, response)
+    except Exception as e:
+        if entry is None:
+            raise
+        logger.warning("Serving cached discovery document for {}...{}",
+                       url, e)
+        entry = dict(entry,
+                     expires_at=time.time() + DISCOVERY_RETRY_INTERVAL)
+        _discovery_cache[url] = entry
+
+    return entry['document']
+
+
+def get_cached_entry(url):
+    return _discovery_cache.get(url) or load_discovery_entry(url)
+
+
+def get_revalidation_headers(entry):
+    if entry is not None and entry.get('etag'):
+        return {'If-None-Match': entry['etag']}
+
+    return {}
+
+
+def apply_discovery_response(url, entry, response):
+    """
+    Updates the cache from a discovery response. Works with requests and
+    httpx responses.
+
+    Args:
+        url (string): The discovery URL.
+        entry (dict): The cached entry the request revalidated or None.
+        response (Response): The discovery response.
+
+    Returns:
+        dict: The updated cache entry.
+    """
+    if response.status_code == 304 and entry is not None:
+        entry = dict(entry, expires_at=get_expires_at(response))
+        logger.debug("Discovery document not modified...{}", url)
+        _discovery_cache[url] = entry
+        return entry
+
+    response.raise_for_status()
+    document = response.json()
+    changed = entry is not None and entry['document'] != document
+    entry = {
+        'url': url,
+        'document': document,
+        'etag': response.headers.get('ETag'),
+        'expires_at': get_expires_at(response),
+    }
+    save_discovery_entry(entry)
+    _discovery_cache[url] = entry
+    logger.info("Fetched discovery document...{}", url)
+
+    if changed:
+        for listener in _discovery_listeners:
+            listener(url)
+
+    return entry
+
+
+def revalidate_in_background(url):
+    with _discovery_lock:
+        if url in _revalidating:
+            return
+        _revalidating.add(url)
+
+    def revalidate():
+        try:
+            fetch_discovery_document(url)
+        except Exception as e:
+            logger.error("Discovery revalidation failed...{}", e)
+        finally:
+            with _discovery_lock:
+                _revalidating.discard(url)
+
+    threading.Thread(target=revalidate, name='discovery-revalidate',
+                     daemon=True).start()
+
+
+def get_expires_at(response):
+    """
+    Returns when a response stops being fresh according to Cache-Control.
+    The lifetime is never shorter than DISCOVERY_MIN_TTL, so a provider
+    sending no-cache or max-age=0 is not revalidated on every call.
+    """
+    max_age = DEFAULT_DISCOVERY_TTL
+    cache_control = response.headers.get('Cache-Control', '')
+    for directive in cache_control.lower().split(','):
+        name, _, value = directive.strip().partition('=')
+        if name in ('no-cache', 'no-store'):
+            max_age = 0
+            break
+        if name == 'max-age' and value.strip('"').isdigit():
+            max_age = int(value.strip('"'))
+
+    return time.time() + max(max_age, DISCOVERY_MIN_TTL)
+
+
+def get_discovery_cache_path(url):
+    digest = hashlib.sha256(url.encode('utf-8')).hexdigest()
+    return os.path.join(os.getcwd(), DISCOVERY_CACHE_DIR, f'{digest}.json')
+
+
+def load_discovery_entry(url):
+    """
+    Loads the last good copy of a discovery document from disk. The copy is
+    treated as stale so it is revalidated before it is trusted as fresh.
+    """
+    path = get_discovery_cache_path(url)
+    try:
+        with open(path, encoding='utf-8') as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    entry['expires_at'] = 0
+
+    return entry
+
+
+def save_discovery_entry(entry):
+    path = get_discovery_cache_path(entry['url'])
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_file_atomically(path, json.dumps(entry))
+    except OSError as e:
+        logger.warning("Unable to save discovery document...{}", e)
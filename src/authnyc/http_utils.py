@@ -0,0 +1,136 @@
+# http_utils.py
+# Description: A Streamlit authentication demonstration application
+# Copyright 2024 Michael Konrad
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# Date: 2026-10-18
+
+import metrics_utils as metrics
+import requests
+import threading
+import time
+
+from common_utils import get_base_configuration
+from loguru import logger
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlsplit
+from urllib3.util.retry import Retry
+
+
+# Defaults for the [http] section of authnyc.toml
+HTTP_DEFAULTS = {
+    'pool_connections': 10,
+    'pool_maxsize': 20,
+    'connect_timeout': 3.05,
+    'read_timeout': 10.0,
+    'retries': 3,
+    'backoff_factor': 0.5,
+}
+
+_session = None
+_timeout = None
+_session_lock = threading.Lock()
+
+HTTP_DURATION = metrics.histogram('authnyc_http_request_duration_seconds',
+                                  "Time spent on outbound HTTP requests.",
+                                  labels=('method', 'host', 'status'))
+HTTP_ERRORS = metrics.counter('authnyc_http_request_errors_total',
+                              "Outbound HTTP requests which got no response.",
+                              labels=('method', 'host'))
+
+
+def get_http_config():
+    authnyc = get_base_configuration()
+    http_config = dict(HTTP_DEFAULTS)
+    http_config.update(authnyc.get('http', {}))
+
+    return http_config
+
+
+def get_http_session():
+    """
+    Returns the process-wide HTTP session.
+
+    The session keeps connections to each host alive in a pool, so repeat
+    calls to the same provider skip the TCP and TLS handshakes. Failed
+    connections and 5xx responses to idempotent requests are retried with
+    exponential backoff.
+
+    Returns:
+        requests.Session: The shared session.
+    """
+    global _session, _timeout
+
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                http_config = get_http_config()
+                _timeout = (http_config['connect_timeout'],
+                            http_config['read_timeout'])
+                _session = create_http_session(http_config)
+
+    return _session
+
+
+def create_http_session(http_config):
+    retry = Retry(total=http_config['retries'],
+                  backoff_factor=http_config['backoff_factor'],
+                  status_forcelist=(500, 502, 503, 504),
+                  raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=http_config['pool_connections'],
+                          pool_maxsize=http_config['pool_maxsize'],
+                          max_retries=retry)
+
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    logger.info("Created HTTP session...{}", http_config)
+
+    return session
+
+
+def request(method, url, **kwargs):
+    """
+    Sends a request through the shared HTTP session.
+
+    The configured connect and read timeouts apply unless a timeout is
+    given. Each request is timed by method, host and status.
+
+    Returns:
+        requests.Response: The response.
+    """
+    session = get_http_session()
+    kwargs.setdefault('timeout', _timeout)
+
+    host = urlsplit(url).hostname
+    started = time.perf_counter()
+    try:
+        response = session.request(method, url, **kwargs)
+    except requests.RequestException:
+        HTTP_ERRORS.inc(method=method, host=host)
+        raise
+    HTTP_DURATION.observe(time.perf_counter() - started, method=method,
+                          host=host, status=response.status_code)
+
+    return response
+
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
+
+
+def patch(url, **kwargs):
+    return request('PATCH', url, **kwargs)
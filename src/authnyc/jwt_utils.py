@@ -0,0 +1,149 @@
+# jwt_utils.py
+# Description: A Streamlit authentication demonstration application
+# Copyright 2024 Michael Konrad
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# Date: 2026-10-18
+
+import http_utils as http
+import jwt
+import threading
+import time
+
+from loguru import logger
+
+
+# Signing algorithms accepted for id_tokens
+ID_TOKEN_ALGORITHMS = ["RS256", "ES256"]
+
+# Seconds a fetched JWKS is trusted before it is fetched again
+JWKS_TTL = 3600
+
+# Minimum seconds between fetches triggered by an unknown key id
+JWKS_MIN_REFETCH_INTERVAL = 30
+
+# Seconds of clock skew allowed when checking exp, iat and nbf
+CLOCK_SKEW_LEEWAY = 30
+
+# Claims an id_token is rejected without
+ID_TOKEN_REQUIRED_CLAIMS = ["exp", "iat", "iss", "aud"]
+
+# Process-wide signing keys keyed by jwks_uri
+_jwks_cache = {}
+_jwks_lock = threading.Lock()
+
+
+def fetch_jwks(jwks_uri):
+    """
+    Fetches a JSON Web Key Set.
+
+    Args:
+        jwks_uri (string): The provider's jwks_uri.
+
+    Returns:
+        dict: The signing keys keyed by key id.
+    """
+    response = http.get(jwks_uri)
+    response.raise_for_status()
+
+    return parse_jwks(jwks_uri, response.json())
+
+
+def parse_jwks(jwks_uri, jwks):
+    jwk_set = jwt.PyJWKSet.from_dict(jwks)
+    logger.info("Fetched {} signing keys...{}", len(jwk_set.keys), jwks_uri)
+
+    return {jwk.key_id: jwk for jwk in jwk_set.keys}
+
+
+def cache_jwks(jwks_uri, jwks):
+    """
+    Seeds the JWKS cache with a key set fetched elsewhere, e.g. at startup.
+
+    Args:
+        jwks_uri (string): The provider's jwks_uri.
+        jwks (dict): The JSON Web Key Set.
+    """
+    entry = {'keys': parse_jwks(jwks_uri, jwks),
+             'fetched_at': time.monotonic()}
+    with _jwks_lock:
+        _jwks_cache[jwks_uri] = entry
+
+
+def get_signing_key(jwks_uri, kid):
+    """
+    Returns the signing key for a key id from the cached JWKS.
+
+    The JWKS is fetched again once it is older than JWKS_TTL, or when the
+    key id is unknown, which picks up rotated keys. Fetches for unknown key
+    ids happen at most every JWKS_MIN_REFETCH_INTERVAL seconds.
+
+    Args:
+        jwks_uri (string): The provider's jwks_uri.
+        kid (string): The key id from the token header.
+
+    Returns:
+        PyJWK: The signing key.
+    """
+    entry = _jwks_cache.get(jwks_uri)
+    if entry is None or needs_jwks_fetch(entry, kid):
+        with _jwks_lock:
+            entry = _jwks_cache.get(jwks_uri)
+            if entry is None or needs_jwks_fetch(entry, kid):
+                entry = {'keys': fetch_jwks(jwks_uri),
+                         'fetched_at': time.monotonic()}
+                _jwks_cache[jwks_uri] = entry
+
+    signing_key = entry['keys'].get(kid)
+    if signing_key is None:
+        raise jwt.InvalidTokenError(f"Unknown signing key {kid}.")
+
+    return signing_key
+
+
+def needs_jwks_fetch(entry, kid):
+    age = time.monotonic() - entry['fetched_at']
+    if age >= JWKS_TTL:
+        return True
+
+    return kid not in entry['keys'] and age >= JWKS_MIN_REFETCH_INTERVAL
+
+
+def verify_id_token(id_token, oidc_config):
+    """
+    Verifies an id_token's signature and standard claims locally.
+
+    Args:
+        id_token (string): The encoded id_token.
+        oidc_config (dict): The provider configuration holding the discovery
+                            document under provider and the client settings
+                            under client.
+
+    Returns:
+        dict: The verified claims.
+    """
+    provider = oidc_config['provider']
+    client = oidc_config['client']
+
+    header = jwt.get_unverified_header(id_token)
+    if header.get('alg') not in ID_TOKEN_ALGORITHMS:
+        raise jwt.InvalidAlgorithmError(
+            f"Unsupported id_token algorithm {header.get('alg')}.")
+
+    signing_key = get_signing_key(provider['jwks_uri'], header.get('kid'))
+
+    return jwt.decode(id_token, key=signing_key.key,
+                      algorithms=ID_TOKEN_ALGORITHMS,
+                      audience=client['client_id'],
+                      issuer=provider['issuer'],
+                      leeway=CLOCK_SKEW_LEEWAY,
+                      options={'require': ID_TOKEN_REQUIRED_CLAIMS})
@@ -0,0 +1,303 @@
+# metrics_utils.py
+# Description: A Streamlit authentication demonstration application
+# Copyright 2024 Michael Konrad
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# Date: 2026-10-18
+
+import functools
+import os
+import threading
+import time
+
+from common_utils import get_base_configuration, write_file_atomically
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from loguru import logger
+
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0)
+
+# Defaults for the [metrics] section of authnyc.toml, a port of 0 and an
+# empty file disable the exporters
+METRICS_DEFAULTS = {
+    'host': '127.0.0.1',
+    'port': 0,
+    'file': '',
+    'write_interval': 15.0,
+}
+
+# Registered metrics keyed by name
+_metrics = {}
+_metrics_lock = threading.Lock()
+_exporter_started = False
+
+# Callable telling whether the process is ready to serve, answered at /ready
+_readiness_check = None
+
+
+class Counter:
+    """
+    A monotonically increasing count per label set.
+
+    Args:
+        name (string): The metric name.
+        help (string): The metric description.
+        labels (tuple): The label names.
+    """
+
+    type = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[label]) for label in self.labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            values = dict(self.values)
+        for key, value in values.items():
+            yield self.name, dict(zip(self.labels, key)), value
+
+
+class Gauge(Counter):
+    """
+    A value per label set which can go up and down.
+    """
+
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        key = tuple(str(labels[label]) for label in self.labels)
+        with self.lock:
+            self.values[key] = value
+
+
+class Histogram:
+    """
+    Observations counted into cumulative buckets per label set.
+
+    Args:
+        name (string): The metric name.
+        help (string): The metric description.
+        labels (tuple): The label names.
+        buckets (tuple): The bucket upper bounds.
+    """
+
+    type = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[label]) for label in self.labels)
+        with self.lock:
+            counts = self.values.get(key)
+            if counts is None:
+                # One count per bucket, then sum and count
+                counts = self.values[key] = [0] * len(self.buckets) + [0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-2] += value
+            counts[-1] += 1
+
+    def samples(self):
+        with self.lock:
+            values = {key: list(counts) for key, counts in self.values.items()}
+        for key, counts in values.items():
+            labels = dict(zip(self.labels, key))
+            for bound, count in zip(self.buckets, counts):
+                yield f'{self.name}_bucket', dict(labels, le=str(bound)), count
+            yield f'{self.name}_bucket', dict(labels, le='+Inf'), counts[-1]
+            yield f'{self.name}_sum', labels, counts[-2]
+            yield f'{self.name}_count', labels, counts[-1]
+
+
+def register(metric_class, name, help, **kwargs):
+    metric = _metrics.get(name)
+    if metric is None:
+        with _metrics_lock:
+            metric = _metrics.get(name)
+            if metric is None:
+                metric = _metrics[name] = metric_class(name, help, **kwargs)
+
+    return metric
+
+
+def counter(name, help, labels=()):
+    return register(Counter, name, help, labels=labels)
+
+
+def gauge(name, help, labels=()):
+    return register(Gauge, name, help, labels=labels)
+
+
+def histogram(name, help, labels=(), buckets=LATENCY_BUCKETS):
+    return register(Histogram, name, help, labels=labels, buckets=buckets)
+
+
+FUNCTION_DURATION = histogram('authnyc_function_duration_seconds',
+                              "Time spent in instrumented functions.",
+                              labels=('function',))
+FUNCTION_ERRORS = counter('authnyc_function_errors_total',
+                          "Exceptions raised by instrumented functions.",
+                          labels=('function',))
+
+
+def timed(function_name):
+    """
+    Decorates a function to record its duration and errors under the
+    function label. Streamlit reruns and stops are not counted as errors.
+
+    Args:
+        function_name (string): The function label value.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            except Exception:
+                FUNCTION_ERRORS.inc(function=function_name)
+                raise
+            finally:
+                FUNCTION_DURATION.observe(time.perf_counter() - started,
+                                          function=function_name)
+
+        return wrapper
+
+    return decorator
+
+
+def render_metrics():
+    """
+    Renders every registered metric in the Prometheus text exposition
+    format.
+
+    Returns:
+        string: The exposition text.
+    """
+    lines = []
+    for metric in sorted(_metrics.values(), key=lambda metric: metric.name):
+        lines.append(f'# HELP {metric.name} {metric.help}')
+        lines.append(f'# TYPE {metric.name} {metric.type}')
+        for name, labels, value in metric.samples():
+            if labels:
+                label_text = ','.join(f'{k}="{escape_label(v)}"'
+                                      for k, v in labels.items())
+                name = f'{name}{{{label_text}}}'
+            lines.append(f'{name} {value}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def escape_label(value):
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def set_readiness_check(check):
+    """
+    Sets the callable answering /ready, which returns True once the process
+    is ready to serve sessions.
+    """
+    global _readiness_check
+
+    _readiness_check = check
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        if path == '/metrics':
+            status = 200
+            content_type = 'text/plain; version=0.0.4'
+            body = render_metrics()
+        elif path == '/ready':
+            ready = _readiness_check is not None and _readiness_check()
+            status = 200 if ready else 503
+            content_type = 'text/plain'
+            body = 'ready\n' if ready else 'not ready\n'
+        else:
+            self.send_error(404)
+            return
+
+        body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_exporter():
+    """
+    Starts the exporters configured under [metrics] in authnyc.toml, once
+    per process: an HTTP endpoint serving /metrics and /ready on host and
+    port, and a file rewritten every write_interval seconds.
+    """
+    global _exporter_started
+
+    with _metrics_lock:
+        if _exporter_started:
+            return
+        _exporter_started = True
+
+    metrics_config = dict(METRICS_DEFAULTS)
+    metrics_config.update(get_base_configuration().get('metrics', {}))
+
+    if metrics_config['port']:
+        address = (metrics_config['host'], metrics_config['port'])
+        try:
+            server = ThreadingHTTPServer(address, MetricsHandler)
+        except OSError as e:
+            # Another worker process already serves the port
+            logger.warning("Unable to serve metrics on {}...{}", address, e)
+        else:
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever,
+                             name='metrics-http', daemon=True).start()
+            logger.info("Serving /metrics and /ready on http://{}:{}",
+                        *address)
+
+    if metrics_config['file']:
+        metrics_path = os.path.join(os.getcwd(), metrics_config['file'])
+        interval = metrics_config['write_interval']
+
+        def write_metrics():
+            while True:
+                time.sleep(interval)
+                try:
+                    write_file_atomically(metrics_path, render_metrics())
+                except OSError as e:
+                    logger.warning("Unable to write metrics...{}", e)
+
+        threading.Thread(target=write_metrics, name='metrics-file',
+                         daemon=True).start()
+        logger.info("Writing metrics every {}s...{}", interval, metrics_path)
@@ -0,0 +1,156 @@
+# mgmt_utils.py
+# Description: A Streamlit authentication demonstration application
+# Copyright 2024 Michael Konrad
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# Date: 2026-10-18
+
+import http_utils as http
+import threading
+
+from auth0.exceptions import Auth0Error
+from common_utils import get_base_configuration
+from rate_limit_utils import RateLimiter
+from urllib.parse import quote
+
+
+# Defaults for the [mgmt_api] section of authnyc.toml
+MGMT_API_DEFAULTS = {
+    'rate_limit': 2.0,
+    'burst': 10,
+    'rate_limit_retries': 3,
+}
+
+# Management API rate limiters keyed by tenant domain
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_client_credentials_token(domain, client_id, client_secret, audience):
+    """
+    Requests an access token with the client credentials grant, through
+    the tenant's rate limiter.
+
+    Args:
+        domain (string): The Auth0 tenant domain.
+        client_id (string): The machine to machine application client id.
+        client_secret (string): The machine to machine application secret.
+        audience (string): The API audience.
+
+    Returns:
+        dict: The token response with access_token and expires_in.
+    """
+    response = send_request(get_rate_limiter(domain), 'POST',
+                            f'https://{domain}/oauth/token', json={
+                                'client_id': client_id,
+                                'client_secret': client_secret,
+                                'audience': audience,
+                                'grant_type': 'client_credentials',
+                            })
+
+    return parse_response(response)
+
+
+def get_mgmt_api_config():
+    mgmt_api_config = dict(MGMT_API_DEFAULTS)
+    mgmt_api_config.update(get_base_configuration().get('mgmt_api', {}))
+
+    return mgmt_api_config
+
+
+def get_rate_limiter(domain):
+    """
+    Returns the process-wide Management API rate limiter of a tenant.
+    """
+    rate_limiter = _rate_limiters.get(domain)
+    if rate_limiter is None:
+        with _rate_limiters_lock:
+            rate_limiter = _rate_limiters.get(domain)
+            if rate_limiter is None:
+                mgmt_api_config = get_mgmt_api_config()
+                rate_limiter = RateLimiter(f'mgmt_api:{domain}',
+                                           mgmt_api_config['rate_limit'],
+                                           mgmt_api_config['burst'])
+                _rate_limiters[domain] = rate_limiter
+
+    return rate_limiter
+
+
+def send_request(rate_limiter, method, url, **kwargs):
+    """
+    Sends a request once the rate limiter allows it. Requests answered with
+    429 wait for the limit to reset and are sent again, up to
+    rate_limit_retries times.
+
+    Returns:
+        requests.Response: The last response.
+    """
+    retries = get_mgmt_api_config()['rate_limit_retries']
+    for _ in range(retries + 1):
+        rate_limiter.acquire()
+        response = http.request(method, url, **kwargs)
+        rate_limiter.update(response.status_code, response.headers)
+        if response.status_code != 429:
+            break
+
+    return response
+
+
+def parse_response(response):
+    """
+    Returns the JSON content of an Auth0 response, raising Auth0Error for
+    error responses like the Auth0 SDK does.
+    """
+    content = response.json() if response.content else {}
+    if response.status_code >= 400:
+        if not isinstance(content, dict):
+            content = {}
+        raise Auth0Error(response.status_code,
+                         content.get('errorCode', content.get('error', '')),
+                         content.get('error_description',
+                                     content.get('message', response.reason)),
+                         content)
+
+    return content
+
+
+class ManagementClient:
+    """
+    A minimal Auth0 Management API client which sends its requests through
+    the shared HTTP session and the tenant's rate limiter. Requests answered
+    with 429 wait for the limit to reset and are sent again.
+
+    Args:
+        domain (string): The Auth0 tenant domain.
+        token (string): The Management API access token.
+    """
+
+    def __init__(self, domain, token):
+        self.base_url = f'https://{domain}/api/v2'
+        self.headers = {'Authorization': f'Bearer {token}'}
+        self.rate_limiter = get_rate_limiter(domain)
+
+    def request(self, method, path, **kwargs):
+        response = send_request(self.rate_limiter, method,
+                                self.base_url + path, headers=self.headers,
+                                **kwargs)
+
+        return parse_response(response)
+
+    def update_user(self, id, body):
+        """
+        Updates a user with the attributes passed in body.
+
+        See: https://auth0.com/docs/api/v2#!/Users/patch_users_by_id
+        """
+        return self.request('PATCH', f"/users/{quote(id, safe='')}",
+                            json=body)
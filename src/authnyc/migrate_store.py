@@ -0,0 +1,100 @@
+# migrate_store.py
+# Description: A Streamlit authentication demonstration application
+# Copyright 2024 Michael Konrad
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# Date: 2026-10-18
+#
+# One-shot migration of the TinyDB JSON stores into the SQLite store.
+#
+# USAGE: python src/authnyc/migrate_store.py [--source-dir DIR]
+#                                             [--sqlite-file FILE] [--force]
+
+import argparse
+import os
+import sys
+
+from common_utils import STORE_INDEXES, get_base_configuration
+from loguru import logger
+from store_utils import SQLiteStore
+from tinydb import TinyDB
+
+
+def migrate_store(name, json_path, sqlite_path, force=False):
+    """
+    Copies every document of a TinyDB JSON store into a SQLite store table.
+
+    Args:
+        name (string): The store name, one of user, oidc or config.
+        json_path (string): The path to the TinyDB JSON file.
+        sqlite_path (string): The path to the SQLite database file.
+        force (bool): Migrate even if the SQLite table already has documents.
+
+    Returns:
+        int: The number of documents migrated.
+    """
+    if not os.path.exists(json_path):
+        logger.info("No {} store to migrate...{}", name, json_path)
+        return 0
+
+    store = SQLiteStore(sqlite_path, name, indexes=STORE_INDEXES[name])
+    try:
+        if len(store) and not force:
+            logger.warning("The {} table already has documents, skipping.",
+                           name)
+            return 0
+
+        with TinyDB(json_path, access_mode='r') as db:
+            # Keep the TinyDB insertion order so the newest record wins
+            documents = sorted(db.all(), key=lambda doc: doc.doc_id)
+        store.insert_many(documents)
+    finally:
+        store.close()
+
+    logger.info("Migrated {} {} documents...{}", len(documents), name,
+                json_path)
+
+    return len(documents)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Migrate the Authnyc! TinyDB JSON stores into SQLite.")
+    parser.add_argument('--source-dir', default=os.getcwd(),
+                        help="directory holding the *_db.json files")
+    parser.add_argument('--sqlite-file', default=None,
+                        help="SQLite database file, defaults to the "
+                             "[storage] sqlite_file setting")
+    parser.add_argument('--force', action='store_true',
+                        help="migrate into tables which already have data")
+    args = parser.parse_args(argv)
+
+    sqlite_file = args.sqlite_file
+    if sqlite_file is None:
+        storage_config = get_base_configuration().get('storage', {})
+        sqlite_file = os.path.join(
+            os.getcwd(), storage_config.get('sqlite_file', 'authnyc.db'))
+
+    total = 0
+    for name in STORE_INDEXES:
+        json_path = os.path.join(args.source_dir, f'{name}_db.json')
+        total += migrate_store(name, json_path, sqlite_file, force=args.force)
+
+    logger.info("Migrated {} documents into...{}", total, sqlite_file)
+    logger.info("Set backend = 'sqlite' under [storage] in authnyc.toml to "
+                "use the migrated stores.")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -14,11 +14,12 @@
 # limitations under the License.
 # Date: 2024-06-19
 
+import dataclasses
 import streamlit as st
 
-from auth_utils import get_auth0_api_authenticator
-from user_utils import update_auth0_user
 from loguru import logger
+from profile_update_utils import enqueue_profile_update
+from profile_update_utils import get_profile_update_status
 
 
 def present_profile_form_disabled():
@@ -69,8 +70,64 @@ def profile_form_button_clicked():
         updated_user_record = compare_user_record(user_record_keys)
 
         if updated_user_record is not None:
-            auth0_mgmt_api = get_auth0_api_authenticator()
-            update_auth0_user(updated_user_record, auth0_mgmt_api)
+            # Applied by a background worker, the form shows the update
+            # status until then
+            if enqueue_profile_update(updated_user_record):
+                changes = dict(updated_user_record)
+                del changes['sub']
+                # Shown until the update is applied, the claims from before
+                # the first pending edit are restored if it fails
+                st.session_state.setdefault('profile_update_rollback',
+                                            st.session_state['user_record'])
+                st.session_state['user_record'] = dataclasses.replace(
+                    st.session_state['user_record'], **changes)
+            else:
+                st.session_state['profile_update_rejected'] = True
+
+
+def settle_profile_update():
+    """
+    Keeps the optimistically updated claims once the profile update was
+    applied, or restores the previous claims if it failed. Called before
+    the profile forms are rendered.
+    """
+    if 'profile_update_rollback' not in st.session_state:
+        return
+
+    previous = st.session_state['profile_update_rollback']
+    status = get_profile_update_status(previous['sub'])
+    if status is None or status['state'] == 'failed':
+        logger.info("Profile update not applied, restoring claims...{}",
+                    previous['sub'])
+        st.session_state['user_record'] = previous
+        del st.session_state['profile_update_rollback']
+    elif status['state'] == 'applied':
+        del st.session_state['profile_update_rollback']
+
+
+def present_profile_update_status():
+    if 'user_record' in st.session_state:
+        if st.session_state.pop('profile_update_rejected', False):
+            st.error("Too many profile updates are waiting, please try "
+                     "again shortly.")
+            return
+
+        status = get_profile_update_status(st.session_state.user_record['sub'])
+        if status is None:
+            return
+        if status['state'] in ('queued', 'applying'):
+            st.caption("Profile update queued...")
+            return
+
+        # The outcome of an update is shown once
+        if st.session_state.get('profile_update_shown') == \
+            status['updated_at']:
+            return
+        st.session_state['profile_update_shown'] = status['updated_at']
+        if status['state'] == 'applied':
+            st.caption("Profile updated.")
+        else:
+            st.error(f"Profile update failed: {status['error']}")
 
 
 def present_sensitive_profile_form_disabled():
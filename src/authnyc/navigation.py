@@ -19,6 +19,7 @@
 import streamlit as st
 
 from auth_utils import login, logout
+from metrics_utils import timed
 from streamlit.runtime.scriptrunner import get_script_run_ctx
 from streamlit.source_util import get_pages
 from loguru import logger
@@ -34,6 +35,7 @@ def get_current_page_name():
     return pages[ctx.page_script_hash]["page_name"]
 
 
+@timed('make_sidebar')
 def make_sidebar():
     with st.sidebar:
         st.title("Auth:red[n]:orange[y]:blue[c]!")
@@ -15,31 +15,127 @@
 # Date: 2024-07-19
 
 import date_utils as du
-import os
-import requests
 import streamlit as st
+import threading
 import uuid
 import validators
 
 from common_utils import update_base_configuration, save_configuration
 from common_utils import get_oidc_providers, get_oidc_api_providers
+from common_utils import get_config_seq, open_store
+from discovery_utils import fetch_discovery_document, get_discovery_document
+from discovery_utils import on_discovery_change
 from loguru import logger
-from tinydb import TinyDB, Query
+from metrics_utils import timed
+from types import MappingProxyType
+
+
+# Immutable provider records keyed by provider name, with the config_seq
+# they were loaded at, replaced as a whole on every write so readers never
+# need the lock
+_provider_registry = (None, None)
+_provider_registry_lock = threading.Lock()
+
+# Provider configurations with current discovery metadata keyed by provider
+# name, with the registry record and discovery document they were built from
+_provider_configs = {}
+
+# Callbacks run with the provider name whenever a provider record changes
+_provider_listeners = []
+
+
+def on_provider_change(listener):
+    """
+    Registers a callback run with the provider name whenever a provider
+    record is saved, so caches built from the record can be dropped.
+    """
+    if listener not in _provider_listeners:
+        _provider_listeners.append(listener)
+
+
+def notify_provider_change(name):
+    logger.debug("Provider record changed...{}", name)
+    for listener in _provider_listeners:
+        listener(name)
 
 
 @st.cache_resource
 def get_oidc_db():
-    oidc_db_file = r'oidc_db.json'
-    oidc_db_path = os.path.join(os.getcwd(), oidc_db_file)
-
-    db = TinyDB(oidc_db_path)
+    db = open_store('oidc')
 
     return db
     
 
 def get_provider_config(provider_key):
+    """
+    Returns a provider record with its provider metadata taken from the
+    discovery document cache, so rotated endpoints and keys are picked up.
+
+    Args:
+        provider_key (string): The provider name.
+
+    Returns:
+        mappingproxy: The read-only provider record.
+
+    Raises:
+        ValueError: If the provider has not been saved.
+    """
     #logger.debug("Get OIDC provider config - state...{}", st.session_state)
-    return lookup_provider(provider_key)
+    provider_record = lookup_provider(provider_key)
+    if provider_record is None:
+        raise ValueError(f"Unknown OIDC provider {provider_key}.")
+
+    discovery_url = get_discovery_url(provider_record)
+    if discovery_url is None:
+        return provider_record
+
+    try:
+        document = get_discovery_document(discovery_url)
+    except Exception as e:
+        logger.warning("Using stored provider metadata...{}", e)
+        return provider_record
+
+    cached = _provider_configs.get(provider_key)
+    if cached is not None and cached[0] is provider_record and \
+        cached[1] is document:
+        return cached[2]
+
+    config = dict(provider_record['config'])
+    config['provider'] = freeze(document)
+    provider_config = dict(provider_record)
+    provider_config['config'] = MappingProxyType(config)
+    provider_config = MappingProxyType(provider_config)
+    _provider_configs[provider_key] = (provider_record, document,
+                                       provider_config)
+
+    return provider_config
+
+
+def get_discovery_url(provider_record):
+    """
+    Returns the discovery URL of an OIDC provider record, derived from the
+    issuer for records saved before the URL was stored.
+    """
+    if provider_record is None:
+        return None
+
+    config = provider_record['config']
+    if 'discovery_url' in config:
+        return config['discovery_url']
+    if 'client' in config and 'issuer' in config['provider']:
+        issuer = config['provider']['issuer'].rstrip('/')
+        return f'{issuer}/.well-known/openid-configuration'
+
+    return None
+
+
+def discovery_document_changed(url):
+    for name, provider_record in get_provider_registry().items():
+        if get_discovery_url(provider_record) == url:
+            notify_provider_change(name)
+
+
+on_discovery_change(discovery_document_changed)
 
 
 def get_oidc_provider_names():
@@ -97,9 +193,10 @@ def validate_oidc_api_form():
 def parse_oidc_configuration():
     oidc_config = {}
     client_config = {}
-    response = requests.get(st.session_state['oidc_discovery_url'])
-    
-    oidc_config['provider'] = response.json()
+    discovery_url = st.session_state['oidc_discovery_url']
+
+    oidc_config['discovery_url'] = discovery_url
+    oidc_config['provider'] = fetch_discovery_document(discovery_url)
     client_config['client_id'] = st.session_state['oidc_client_id']
     client_config['client_secret'] = st.session_state['oidc_client_secret']
     client_config['redirect_uri'] = st.session_state['oidc_redirect_uri']
@@ -126,8 +223,7 @@ def save_oidc_provider(oidc_config):
         oidc_provider['updated_at'] = inserted_at
         oidc_provider['name'] = provider_key
         oidc_provider['config'] = oidc_config
-        oidc_db = get_oidc_db()
-        oidc_db.insert(oidc_provider)
+        register_provider(oidc_provider)
 
     if 'oidc_provider_key' not in st.session_state:
         st.session_state['oidc_provider_key'] = provider_key
@@ -140,7 +236,8 @@ def save_oidc_provider(oidc_config):
 
 
 def save_oidc_api_provider():
-    logger.debug("Save OIDC API provider - state...{}", st.session_state)
+    logger.opt(lazy=True).debug("Save OIDC API provider - state...{}",
+                                lambda: dict(st.session_state))
     api_provider = {}
     provider = {}
     api_config = {}
@@ -164,9 +261,7 @@ def save_oidc_api_provider():
         api_provider['name'] = provider_key
         provider['provider'] = api_config
         api_provider['config'] = provider
-        
-        oidc_db = get_oidc_db()
-        oidc_db.insert(api_provider)
+        register_provider(api_provider)
 
     if 'oidc_api_provider_key' not in st.session_state:
         st.session_state['oidc_api_provider_key'] = provider_key
@@ -176,20 +271,101 @@ def save_oidc_api_provider():
     #logger.debug("Saved OIDC API provider - state...{}", st.session_state)
 
 
+@timed('lookup_provider')
 def lookup_provider(name):
-    oidc_db = get_oidc_db()
-    Provider = Query()
-    provider_record = oidc_db.search(Provider.name == name)
-    if not provider_record:
-        #logger.debug("Provider not found, search result...{}", provider_record)
-        provider_record = None
-    else:
-        #logger.debug("Provider found...{}", provider_record[0])
-        provider_record = dict(provider_record[0])
+    """
+    Looks up a provider record in the in-process provider registry. A
+    provider missing from the registry is looked up again in the OIDC
+    store, as another worker process may have saved it.
+
+    Args:
+        name (string): The provider name.
+
+    Returns:
+        mappingproxy: The read-only provider record or None.
+    """
+    provider_record = get_provider_registry().get(name)
+    if provider_record is None:
+        provider_record = load_provider_registry(force=True).get(name)
 
     return provider_record
 
 
+def get_provider_registry():
+    """
+    Returns the provider registry, reloaded from the OIDC store whenever
+    config_seq changes.
+    """
+    loaded_seq, registry = _provider_registry
+    if registry is None or loaded_seq != get_config_seq():
+        registry = load_provider_registry()
+
+    return registry
+
+
+def load_provider_registry(force=False):
+    global _provider_registry
+
+    changed = []
+    with _provider_registry_lock:
+        config_seq = get_config_seq()
+        loaded_seq, registry = _provider_registry
+        # Another session may have loaded it while we waited
+        if force or registry is None or loaded_seq != config_seq:
+            previous = registry or {}
+            oidc_db = get_oidc_db()
+            oidc_db.reload()
+            registry = {}
+            # Later records replace earlier ones with the same name
+            for record in oidc_db.all():
+                registry[record['name']] = freeze(record)
+            _provider_registry = (config_seq, registry)
+            logger.debug("Loaded provider registry...{}", list(registry))
+            changed = [name for name in previous
+                       if registry.get(name) != previous[name]]
+
+    # Caches built from records another process changed are dropped
+    for name in changed:
+        notify_provider_change(name)
+
+    return registry
+
+
+def register_provider(provider_record):
+    """
+    Saves a provider record to the OIDC store and the provider registry.
+
+    Args:
+        provider_record (dict): The provider record.
+    """
+    global _provider_registry
+
+    # Load the registry first, loading takes the lock
+    get_provider_registry()
+    with _provider_registry_lock:
+        oidc_db = get_oidc_db()
+        oidc_db.insert(provider_record)
+        loaded_seq, registry = _provider_registry
+        registry = dict(registry)
+        registry[provider_record['name']] = freeze(provider_record)
+        _provider_registry = (loaded_seq, registry)
+
+    notify_provider_change(provider_record['name'])
+
+
+def freeze(value):
+    """
+    Returns a read-only copy of a record, with dictionaries as mapping
+    proxies and lists as tuples.
+    """
+    if isinstance(value, dict):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(v) for v in value)
+
+    return value
+
+
 def get_provider_key(providers, name):
     for k, v in providers.items():
         if k == name:
@@ -17,18 +17,28 @@
 import myprofile_form as pe
 import streamlit as st
 
+from metrics_utils import start_metrics_exporter
 from navigation import make_sidebar
+from profile_utils import profiled
+from warmup_utils import start_warm_up
 
-make_sidebar()
+# A server process may serve this page first
+start_metrics_exporter()
+start_warm_up()
 
-if 'FormSubmitter:user_profile-Edit' in st.session_state and \
-    st.session_state['FormSubmitter:user_profile-Edit'] == True:
-    pe.present_profile_form_enabled()
-else:
-    pe.present_profile_form_disabled()
-    
-if 'FormSubmitter:user_sensitive_profile-Edit' in st.session_state and \
-    st.session_state['FormSubmitter:user_sensitive_profile-Edit'] == True:
-    pe.present_sensitive_profile_form_enabled()
-else:
-    pe.present_sensitive_profile_form_disabled()
\ No newline at end of file
+with profiled('myprofile'):
+    make_sidebar()
+    pe.settle_profile_update()
+
+    if 'FormSubmitter:user_profile-Edit' in st.session_state and \
+        st.session_state['FormSubmitter:user_profile-Edit'] == True:
+        pe.present_profile_form_enabled()
+    else:
+        pe.present_profile_form_disabled()
+    pe.present_profile_update_status()
+
+    if 'FormSubmitter:user_sensitive_profile-Edit' in st.session_state and \
+        st.session_state['FormSubmitter:user_sensitive_profile-Edit'] == True:
+        pe.present_sensitive_profile_form_enabled()
+    else:
+        pe.present_sensitive_profile_form_disabled()
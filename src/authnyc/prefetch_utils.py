@@ -0,0 +1,126 @@
+# prefetch_utils.py
+# Description: A Streamlit authentication demonstration application
+# Copyright 2024 Michael Konrad
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# Date: 2026-10-18
+
+import asyncio
+import discovery_utils as discovery
+import httpx
+import jwt_utils as ju
+import oidc_utils as oidc
+import time
+
+from common_utils import get_oidc_providers, get_oidc_api_providers
+from http_utils import get_http_config
+from loguru import logger
+
+
+def get_prefetch_targets():
+    """
+    Returns the discovery URL of every configured provider which has been
+    saved, keyed by provider name. API providers are discovered through
+    their tenant domain.
+
+    Returns:
+        dict: The discovery URLs keyed by provider name.
+    """
+    targets = {}
+    providers = list(get_oidc_providers().values()) + \
+        list(get_oidc_api_providers().values())
+    for provider_key in providers:
+        provider_record = oidc.lookup_provider(provider_key)
+        if provider_record is None:
+            continue
+
+        discovery_url = oidc.get_discovery_url(provider_record)
+        api_domain = provider_record['config']['provider'].get('api_domain')
+        if discovery_url is None and api_domain:
+            discovery_url = \
+                f'https://{api_domain}/.well-known/openid-configuration'
+        if discovery_url is not None:
+            targets[provider_key] = discovery_url
+
+    return targets
+
+
+async def prefetch_provider(client, provider_key, discovery_url):
+    """
+    Fetches a provider's discovery document and JWKS into the process
+    caches.
+
+    Returns:
+        dict: The provider, its latency in seconds and any error.
+    """
+    started = time.perf_counter()
+    result = {'provider': provider_key, 'url': discovery_url, 'error': None}
+    try:
+        entry = discovery.get_cached_entry(discovery_url)
+        response = await client.get(
+            discovery_url, headers=discovery.get_revalidation_headers(entry))
+        entry = discovery.apply_discovery_response(discovery_url, entry,
+                                                   response)
+
+        jwks_uri = entry['document'].get('jwks_uri')
+        if jwks_uri:
+            response = await client.get(jwks_uri)
+            response.raise_for_status()
+            ju.cache_jwks(jwks_uri, response.json())
+    except Exception as e:
+        result['error'] = repr(e)
+
+    result['latency'] = time.perf_counter() - started
+
+    return result
+
+
+async def prefetch_all(targets):
+    http_config = get_http_config()
+    timeout = httpx.Timeout(http_config['read_timeout'],
+                            connect=http_config['connect_timeout'])
+    limits = httpx.Limits(max_connections=http_config['pool_maxsize'])
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        return await asyncio.gather(
+            *(prefetch_provider(client, provider_key, discovery_url)
+              for provider_key, discovery_url in targets.items()))
+
+
+def prefetch_providers():
+    """
+    Fetches the discovery documents and JWKS of all configured providers
+    concurrently, so a cold start takes as long as the slowest provider
+    rather than the sum of them. Failures are logged and left for the
+    request path to retry.
+
+    Returns:
+        list: The per provider results.
+    """
+    targets = get_prefetch_targets()
+    if not targets:
+        return []
+
+    started = time.perf_counter()
+    results = asyncio.run(prefetch_all(targets))
+    for result in results:
+        if result['error'] is None:
+            logger.info("Prefetched provider {} in {:.3f}s",
+                        result['provider'], result['latency'])
+        else:
+            logger.warning("Prefetch of provider {} failed after {:.3f}s...{}",
+                           result['provider'], result['latency'],
+                           result['error'])
+    logger.info("Prefetched {} providers in {:.3f}s", len(results),
+                time.perf_counter() - started)
+
+    return results
+
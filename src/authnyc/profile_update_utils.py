@@ -0,0 +1,185 @@
+# profile_update_utils.py
+# Description: A Streamlit authentication demonstration application
+# Copyright 2024 Michael Konrad
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# Date: 2026-10-18
+
+import metrics_utils as metrics
+import queue
+import random
+import requests
+import threading
+import time
+
+from auth0.exceptions import Auth0Error
+from auth_utils import get_auth0_api_authenticator
+from collections import OrderedDict
+from loguru import logger
+from user_utils import update_auth0_user
+
+
+# Background threads applying profile updates
+PROFILE_UPDATE_WORKERS = 2
+
+# Maximum users with a profile update waiting to be applied
+PROFILE_UPDATE_QUEUE_SIZE = 1000
+
+# Attempts made to apply an update before it is marked failed
+PROFILE_UPDATE_ATTEMPTS = 5
+
+# Seconds before the first retry, doubled for each retry up to the maximum
+PROFILE_UPDATE_BACKOFF = 0.5
+PROFILE_UPDATE_MAX_BACKOFF = 30.0
+
+# Number of users whose last update status is remembered
+PROFILE_STATUS_SIZE = 10000
+
+# Users with a waiting update, each queued once
+_update_queue = queue.Queue(maxsize=PROFILE_UPDATE_QUEUE_SIZE)
+
+# Waiting changes keyed by sub, later edits are merged into earlier ones
+_pending = {}
+
+# Last update status keyed by sub
+_statuses = OrderedDict()
+_update_lock = threading.Lock()
+_workers_started = False
+
+PROFILE_UPDATES = metrics.counter('authnyc_profile_updates_total',
+                                  "Profile updates by outcome.",
+                                  labels=('outcome',))
+PROFILE_QUEUE_DEPTH = metrics.gauge('authnyc_profile_update_queue_depth',
+                                    "Users with a profile update waiting.")
+
+
+def enqueue_profile_update(updated_user_record):
+    """
+    Queues a profile update for the background workers. An update for a
+    user who already has one waiting is merged into it, so repeated edits
+    are applied with one call.
+
+    Args:
+        updated_user_record (dict): The sub and the changed attributes.
+
+    Returns:
+        bool: False if the queue is full and the update was not queued.
+    """
+    start_profile_workers()
+
+    changes = dict(updated_user_record)
+    sub = changes.pop('sub')
+    with _update_lock:
+        if sub in _pending:
+            _pending[sub].update(changes)
+            PROFILE_UPDATES.inc(outcome='coalesced')
+        else:
+            try:
+                _update_queue.put_nowait(sub)
+            except queue.Full:
+                PROFILE_UPDATES.inc(outcome='rejected')
+                logger.warning("Profile update queue is full...{}", sub)
+                return False
+            _pending[sub] = changes
+        set_status(sub, 'queued')
+        PROFILE_QUEUE_DEPTH.set(len(_pending))
+
+    return True
+
+
+def get_profile_update_status(sub):
+    """
+    Returns the status of the user's latest profile update.
+
+    Returns:
+        dict: The state, one of queued, applying, applied or failed, with
+              the time it was set and any error, or None.
+    """
+    with _update_lock:
+        return _statuses.get(sub)
+
+
+def set_status(sub, state, error=None):
+    _statuses[sub] = {'state': state, 'updated_at': time.time(),
+                      'error': error}
+    _statuses.move_to_end(sub)
+    while len(_statuses) > PROFILE_STATUS_SIZE:
+        _statuses.popitem(last=False)
+
+
+def start_profile_workers():
+    global _workers_started
+
+    if _workers_started:
+        return
+
+    with _update_lock:
+        if not _workers_started:
+            for i in range(PROFILE_UPDATE_WORKERS):
+                threading.Thread(target=apply_profile_updates,
+                                 name=f'profile-update-{i}',
+                                 daemon=True).start()
+            _workers_started = True
+
+
+def apply_profile_updates():
+    while True:
+        sub = _update_queue.get()
+        with _update_lock:
+            changes = _pending.pop(sub)
+            set_status(sub, 'applying')
+            PROFILE_QUEUE_DEPTH.set(len(_pending))
+
+        error = apply_profile_update(sub, changes)
+        with _update_lock:
+            # Leave the status of a newer edit queued meanwhile
+            if sub not in _pending:
+                set_status(sub, 'failed' if error else 'applied', error)
+        PROFILE_UPDATES.inc(outcome='failed' if error else 'applied')
+
+
+def apply_profile_update(sub, changes):
+    """
+    Applies one user's changes through the Auth0 Management API, retrying
+    server and connection errors with exponential backoff. Rate limited
+    requests are already retried by the ManagementClient.
+
+    Returns:
+        string: The error if the update failed, otherwise None.
+    """
+    for attempt in range(1, PROFILE_UPDATE_ATTEMPTS + 1):
+        try:
+            update_auth0_user({'sub': sub, **changes},
+                              get_auth0_api_authenticator())
+            return None
+        except (Auth0Error, requests.RequestException) as e:
+            if not is_retryable(e) or attempt == PROFILE_UPDATE_ATTEMPTS:
+                logger.error("Profile update failed for {}...{}", sub, e)
+                return str(e)
+            backoff = min(PROFILE_UPDATE_BACKOFF * 2 ** (attempt - 1),
+                          PROFILE_UPDATE_MAX_BACKOFF)
+            # Full jitter keeps retries from many workers apart
+            delay = random.uniform(0, backoff)
+            logger.warning("Retrying profile update for {} in {:.1f}s...{}",
+                           sub, delay, e)
+            time.sleep(delay)
+        except Exception as e:
+            logger.error("Profile update failed for {}...{}", sub, e)
+            return str(e)
+
+
+def is_retryable(error):
+    if isinstance(error, Auth0Error):
+        # A 429 reaching here has used up the client's rate limit retries
+        return error.status_code >= 500
+
+    return True
@@ -0,0 +1,163 @@
+# profile_utils.py
+# Description: A Streamlit authentication demonstration application
+# Copyright 2024 Michael Konrad
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# Date: 2026-10-18
+
+import collections
+import os
+import random
+import streamlit as st
+import sys
+import threading
+import time
+import uuid
+
+from common_utils import get_base_configuration, write_file_atomically
+from contextlib import contextmanager
+from loguru import logger
+
+
+# Defaults for the [profiling] section of authnyc.toml
+PROFILING_DEFAULTS = {
+    'enabled': False,
+    'sample_rate': 0.01,
+    'interval': 0.005,
+    'output_dir': 'profiles',
+}
+
+# Environment variable enabling profiling, 1 or true, or set to a sample
+# rate between 0 and 1
+PROFILE_ENV = 'AUTHNYC_PROFILE'
+
+# Query parameter forcing a profiled rerun while profiling is enabled
+PROFILE_QUERY_PARAM = 'profile'
+
+
+def get_profiling_config():
+    profiling_config = dict(PROFILING_DEFAULTS)
+    profiling_config.update(get_base_configuration().get('profiling', {}))
+
+    profile_env = os.environ.get(PROFILE_ENV)
+    if profile_env:
+        profiling_config['enabled'] = profile_env.lower() not in ('0', 'false')
+        try:
+            sample_rate = float(profile_env)
+        except ValueError:
+            sample_rate = None
+        # 1 enables profiling at the configured rate, it is not a rate
+        if sample_rate is not None and 0 < sample_rate < 1:
+            profiling_config['sample_rate'] = sample_rate
+
+    return profiling_config
+
+
+def should_profile(profiling_config):
+    """
+    Decides whether this rerun is profiled. Only a sample_rate fraction of
+    reruns are, unless the profile query parameter asks for it.
+    """
+    if not profiling_config['enabled']:
+        return False
+    if st.query_params.get(PROFILE_QUERY_PARAM) == '1':
+        return True
+
+    return random.random() < profiling_config['sample_rate']
+
+
+class StackSampler:
+    """
+    Samples the stack of one thread every interval seconds from a
+    background thread and counts the collapsed stacks.
+
+    Args:
+        thread_id (int): The identifier of the thread sampled.
+        interval (float): Seconds between samples.
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run,
+                                       name='profile-sampler', daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse_stack(frame)] += 1
+
+
+def collapse_stack(frame):
+    """
+    Returns a stack in collapsed form, root first, frames separated by
+    semicolons.
+    """
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+        frame = frame.f_back
+
+    return ';'.join(reversed(names))
+
+
+@contextmanager
+def profiled(name):
+    """
+    Profiles the enclosed block when profiling is enabled and the rerun is
+    sampled. The collapsed stacks are written to output_dir, one file per
+    rerun, ready for flamegraph.pl or speedscope.
+
+    Args:
+        name (string): The page name used in the file name.
+    """
+    profiling_config = get_profiling_config()
+    if not should_profile(profiling_config):
+        yield
+        return
+
+    sampler = StackSampler(threading.get_ident(), profiling_config['interval'])
+    started = time.perf_counter()
+    sampler.start()
+    try:
+        yield
+    finally:
+        sampler.stop()
+        write_profile(name, sampler.stacks, time.perf_counter() - started,
+                      profiling_config['output_dir'])
+
+
+def write_profile(name, stacks, seconds, output_dir):
+    timestamp = time.strftime('%Y%m%d-%H%M%S')
+    profile_file = f'{name}-{timestamp}-{uuid.uuid4().hex[:8]}.folded'
+    profile_path = os.path.join(os.getcwd(), output_dir, profile_file)
+    lines = [f'{stack} {count}\n' for stack, count in stacks.most_common()]
+    try:
+        os.makedirs(os.path.dirname(profile_path), exist_ok=True)
+        write_file_atomically(profile_path, ''.join(lines))
+    except OSError as e:
+        logger.warning("Unable to write profile...{}", e)
+        return
+
+    logger.info("Profiled {} rerun in {:.3f}s, {} samples...{}", name,
+                seconds, sum(stacks.values()), profile_path)
@@ -0,0 +1,180 @@
+# rate_limit_utils.py
+# Description: A Streamlit authentication demonstration application
+# Copyright 2024 Michael Konrad
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# Date: 2026-10-18
+
+import metrics_utils as metrics
+import threading
+import time
+
+from collections import deque
+from loguru import logger
+
+
+# Slowest rate, in requests per second, headers can slow a limiter to
+MIN_RATE = 0.1
+
+# Seconds a limiter waits after a 429 response without reset headers
+DEFAULT_RETRY_AFTER = 1.0
+
+RATE_LIMIT_TOKENS = metrics.gauge('authnyc_rate_limit_tokens',
+                                  "Requests a rate limiter can send now.",
+                                  labels=('limiter',))
+RATE_LIMIT_RATE = metrics.gauge('authnyc_rate_limit_rate',
+                                "Requests per second a rate limiter allows.",
+                                labels=('limiter',))
+RATE_LIMIT_WAITERS = metrics.gauge('authnyc_rate_limit_waiters',
+                                   "Callers queued by a rate limiter.",
+                                   labels=('limiter',))
+RATE_LIMIT_WAIT = metrics.histogram('authnyc_rate_limit_wait_seconds',
+                                    "Time callers waited for a rate limiter.",
+                                    labels=('limiter',))
+RATE_LIMITED = metrics.counter('authnyc_rate_limited_total',
+                               "429 responses seen by a rate limiter.",
+                               labels=('limiter',))
+
+
+class RateLimiter:
+    """
+    A token bucket shared by every thread calling one API.
+
+    Callers are served first come, first served: each waits its turn in a
+    queue and then for a token. The rate and the bucket adapt to the
+    X-RateLimit-Limit, X-RateLimit-Remaining and X-RateLimit-Reset headers
+    of the API's responses, and a 429 response holds every caller until
+    the limit resets. Once the limit resets the full rate and bucket are
+    restored.
+
+    Args:
+        name (string): The limiter name used in metrics.
+        rate (float): Requests per second.
+        burst (int): Requests which can be sent at once.
+    """
+
+    def __init__(self, name, rate, burst):
+        self.name = name
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self.reset_at = None
+        self.waiters = deque()
+        self.condition = threading.Condition()
+        self.report()
+
+    def acquire(self):
+        """
+        Waits for the caller's turn and takes a token.
+
+        Returns:
+            float: The seconds waited.
+        """
+        started = time.monotonic()
+        ticket = object()
+        with self.condition:
+            self.waiters.append(ticket)
+            RATE_LIMIT_WAITERS.set(len(self.waiters), limiter=self.name)
+            while True:
+                now = time.monotonic()
+                self.refill(now)
+                delay = None
+                if self.waiters[0] is ticket:
+                    if now < self.blocked_until:
+                        delay = self.blocked_until - now
+                    elif self.tokens < 1:
+                        delay = (1 - self.tokens) / self.rate
+                        if self.reset_at is not None:
+                            delay = min(delay, self.reset_at - now)
+                    else:
+                        break
+                self.condition.wait(delay)
+
+            self.tokens -= 1
+            self.waiters.popleft()
+            self.condition.notify_all()
+            self.report()
+
+        waited = time.monotonic() - started
+        RATE_LIMIT_WAIT.observe(waited, limiter=self.name)
+
+        return waited
+
+    def refill(self, now):
+        if self.reset_at is not None and now >= self.reset_at:
+            # The API's limit has reset, its whole limit is available again
+            self.reset_at = None
+            self.rate = self.max_rate
+            self.tokens = float(self.burst)
+        else:
+            self.tokens = min(self.burst, self.tokens +
+                              (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def update(self, status_code, headers):
+        """
+        Adapts the limiter to an API response.
+
+        Args:
+            status_code (int): The response status.
+            headers (Mapping): The response headers.
+        """
+        limit = parse_number(headers.get('X-RateLimit-Limit'))
+        remaining = parse_number(headers.get('X-RateLimit-Remaining'))
+        reset = parse_number(headers.get('X-RateLimit-Reset'))
+        retry_after = parse_number(headers.get('Retry-After'))
+
+        with self.condition:
+            now = time.monotonic()
+            self.refill(now)
+            reset_in = None
+            if reset is not None:
+                reset_in = max(0.0, reset - time.time())
+                self.reset_at = now + reset_in
+            if limit:
+                self.burst = max(1, int(limit))
+            if remaining is not None:
+                self.tokens = min(self.tokens, remaining)
+                if reset_in:
+                    # Spread what is left of the limit until it resets
+                    self.rate = min(self.max_rate,
+                                    max(MIN_RATE, remaining / reset_in))
+                else:
+                    self.rate = self.max_rate
+
+            if status_code == 429:
+                RATE_LIMITED.inc(limiter=self.name)
+                wait = retry_after if retry_after is not None else reset_in
+                if wait is None:
+                    wait = DEFAULT_RETRY_AFTER
+                self.tokens = 0.0
+                self.blocked_until = max(self.blocked_until, now + wait)
+                logger.warning("Rate limited by {}, holding requests for "
+                               "{:.1f}s", self.name, wait)
+
+            self.condition.notify_all()
+            self.report()
+
+    def report(self):
+        RATE_LIMIT_TOKENS.set(self.tokens, limiter=self.name)
+        RATE_LIMIT_RATE.set(self.rate, limiter=self.name)
+        RATE_LIMIT_WAITERS.set(len(self.waiters), limiter=self.name)
+
+
+def parse_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,388 @@
+# session_utils.py
+# Description: A Streamlit authentication demonstration application
+# Copyright 2024 Michael Konrad
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# Date: 2026-10-18
+
+import base64
+import datetime
+import extra_streamlit_components as stx
+import json
+import os
+import secrets
+import sqlite3
+import streamlit as st
+import threading
+import time
+
+from common_utils import get_base_configuration
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from loguru import logger
+from token_utils import create_auth_context, get_session_token
+
+
+# Defaults for the [session] section of authnyc.toml
+SESSION_DEFAULTS = {
+    'backend': 'memory',
+    'sqlite_file': 'sessions.db',
+    'cookie_name': 'authnyc_session',
+    'ttl': 86400,
+    'sweep_interval': 300,
+}
+
+# Environment variable holding the key session cookies are signed with and
+# saved tokens are encrypted with, every replica must share it
+SESSION_SECRET_ENV = 'AUTHNYC_SESSION_SECRET'
+
+_session_store = None
+_session_store_lock = threading.Lock()
+_session_secret = None
+_serializer = None
+_token_cipher = None
+
+
+class MemorySessionStore:
+    """
+    A session store local to this process, for single node deployments.
+
+    Args:
+        ttl (int): Seconds a session lives after it was last saved.
+        clock (callable): Returns the current time in epoch seconds.
+    """
+
+    def __init__(self, ttl, clock=time.time):
+        self.ttl = ttl
+        self.clock = clock
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    def get(self, session_id):
+        with self.lock:
+            entry = self.sessions.get(session_id)
+        if entry is None or entry[1] <= self.clock():
+            return None
+
+        return entry[0]
+
+    def put(self, session_id, data):
+        with self.lock:
+            self.sessions[session_id] = (data, self.clock() + self.ttl)
+
+    def delete(self, session_id):
+        with self.lock:
+            self.sessions.pop(session_id, None)
+
+    def sweep(self):
+        now = self.clock()
+        with self.lock:
+            expired = [session_id for session_id, entry
+                       in self.sessions.items() if entry[1] <= now]
+            for session_id in expired:
+                del self.sessions[session_id]
+
+        return len(expired)
+
+    def close(self):
+        pass
+
+
+class SQLiteSessionStore:
+    """
+    A session store in a SQLite database which every replica on the host,
+    or on a shared volume, opens.
+
+    Args:
+        path (string): The SQLite database file.
+        ttl (int): Seconds a session lives after it was last saved.
+        clock (callable): Returns the current time in epoch seconds.
+    """
+
+    def __init__(self, path, ttl, clock=time.time):
+        self.path = path
+        self.ttl = ttl
+        self.clock = clock
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False,
+                                    isolation_level=None, timeout=30)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS sessions ('
+            'session_id TEXT PRIMARY KEY, data TEXT, expires_at REAL)')
+        self.conn.execute(
+            'CREATE INDEX IF NOT EXISTS sessions_expires_at '
+            'ON sessions (expires_at)')
+
+    def get(self, session_id):
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT data FROM sessions '
+                'WHERE session_id = ? AND expires_at > ?',
+                (session_id, self.clock())).fetchone()
+
+        return None if row is None else json.loads(row[0])
+
+    def put(self, session_id, data):
+        with self.lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO sessions '
+                '(session_id, data, expires_at) VALUES (?, ?, ?)',
+                (session_id, json.dumps(data), self.clock() + self.ttl))
+
+    def delete(self, session_id):
+        with self.lock:
+            self.conn.execute('DELETE FROM sessions WHERE session_id = ?',
+                              (session_id,))
+
+    def sweep(self):
+        with self.lock:
+            cursor = self.conn.execute(
+                'DELETE FROM sessions WHERE expires_at <= ?',
+                (self.clock(),))
+
+        return cursor.rowcount
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def get_session_config():
+    session_config = dict(SESSION_DEFAULTS)
+    session_config.update(get_base_configuration().get('session', {}))
+
+    return session_config
+
+
+def get_session_store():
+    """
+    Returns the process-wide session store configured under [session] in
+    authnyc.toml, starting its TTL sweeper.
+
+    Returns:
+        SQLiteSessionStore: The session store, or a MemorySessionStore.
+    """
+    global _session_store
+
+    if _session_store is None:
+        with _session_store_lock:
+            if _session_store is None:
+                session_config = get_session_config()
+                _session_store = open_session_store(session_config)
+                start_session_sweeper(_session_store,
+                                      session_config['sweep_interval'])
+
+    return _session_store
+
+
+def open_session_store(session_config):
+    backend = session_config['backend']
+    if backend == 'sqlite':
+        # Sessions saved with a per process secret are unreadable after a
+        # restart and by other replicas
+        if not os.environ.get(SESSION_SECRET_ENV):
+            raise ValueError(f"{SESSION_SECRET_ENV} must be set for the "
+                             f"sqlite session backend.")
+        path = os.path.join(os.getcwd(), session_config['sqlite_file'])
+        logger.info("Opening session store...{}", path)
+        return SQLiteSessionStore(path, session_config['ttl'])
+    if backend == 'memory':
+        return MemorySessionStore(session_config['ttl'])
+
+    raise ValueError(f"Unknown session backend {backend}.")
+
+
+def start_session_sweeper(session_store, interval):
+    def sweep():
+        while True:
+            time.sleep(interval)
+            try:
+                swept = session_store.sweep()
+            except Exception as e:
+                logger.error("Session sweep failed...{}", e)
+                continue
+            if swept:
+                logger.debug("Swept expired sessions...{}", swept)
+
+    threading.Thread(target=sweep, name='session-sweeper',
+                     daemon=True).start()
+
+
+def get_session_secret():
+    global _session_secret
+
+    if _session_secret is None:
+        secret = os.environ.get(SESSION_SECRET_ENV)
+        if not secret:
+            logger.warning("{} is not set, sessions only work with this "
+                           "process.", SESSION_SECRET_ENV)
+            secret = secrets.token_urlsafe(32)
+        _session_secret = secret
+
+    return _session_secret
+
+
+def get_serializer():
+    global _serializer
+
+    if _serializer is None:
+        _serializer = URLSafeTimedSerializer(get_session_secret(),
+                                             salt='authnyc-session')
+
+    return _serializer
+
+
+def get_token_cipher():
+    """
+    Returns the Fernet cipher saved tokens are encrypted with, keyed by a
+    key derived from the session secret.
+    """
+    global _token_cipher
+
+    if _token_cipher is None:
+        key = HKDF(algorithm=hashes.SHA256(), length=32, salt=None,
+                   info=b'authnyc-session-token').derive(
+                       get_session_secret().encode('utf-8'))
+        _token_cipher = Fernet(base64.urlsafe_b64encode(key))
+
+    return _token_cipher
+
+
+def encrypt_token(token):
+    return get_token_cipher().encrypt(
+        json.dumps(token).encode('utf-8')).decode('ascii')
+
+
+def decrypt_token(encrypted_token):
+    return json.loads(get_token_cipher().decrypt(encrypted_token))
+
+
+def get_cookie_session_id():
+    """
+    Returns the session id from the signed session cookie the browser
+    connected with, or None if it is missing, forged or older than the TTL.
+    """
+    session_config = get_session_config()
+    cookie = st.context.cookies.get(session_config['cookie_name'])
+    if not cookie:
+        return None
+
+    try:
+        return get_serializer().loads(cookie, max_age=session_config['ttl'])
+    except BadSignature:
+        logger.warning("Ignoring session cookie with a bad signature.")
+        return None
+
+
+def restore_session():
+    """
+    Restores the session's auth context from the shared session store, so a
+    login survives a reconnect, a move to another replica or the eviction
+    of its token from the token cache.
+
+    Returns:
+        bool: True if an auth context was restored.
+    """
+    session_id = st.session_state.get('auth_session_id') or \
+        get_cookie_session_id()
+    if session_id is None:
+        return False
+
+    data = get_session_store().get(session_id)
+    if data is None:
+        return False
+
+    try:
+        token = decrypt_token(data['token'])
+    except (InvalidToken, TypeError):
+        # Saved with another secret, or before tokens were encrypted
+        logger.warning("Ignoring session which cannot be decrypted...{}",
+                       session_id)
+        return False
+
+    auth_context = create_auth_context(token)
+    st.session_state['auth_context'] = auth_context
+    st.session_state['auth_session_id'] = session_id
+    st.session_state['saved_auth_context'] = auth_context
+    logger.debug("Restored session...{}", session_id)
+
+    return True
+
+
+def restore_session_token():
+    """
+    Returns the session's token, restoring it from the shared session store
+    when it was evicted from the token cache.
+
+    Returns:
+        dict: The token response, or None if it could not be restored.
+    """
+    token = get_session_token()
+    if token is None and 'auth_context' in st.session_state and \
+        restore_session():
+        logger.info("Restored evicted session token...{}",
+                    st.session_state['auth_session_id'])
+        token = get_session_token()
+
+    return token
+
+
+def save_session():
+    """
+    Saves the session's token, encrypted, to the shared session store
+    whenever the auth context changed, and has the session cookie set for a
+    new session.
+    """
+    auth_context = st.session_state.get('auth_context')
+    if auth_context is None or \
+        st.session_state.get('saved_auth_context') is auth_context:
+        return
+
+    session_id = st.session_state.get('auth_session_id')
+    if session_id is None:
+        session_id = secrets.token_urlsafe(32)
+        st.session_state['auth_session_id'] = session_id
+        st.session_state['session_cookie_pending'] = \
+            get_serializer().dumps(session_id)
+
+    get_session_store().put(session_id,
+                            {'token': encrypt_token(get_session_token())})
+    st.session_state['saved_auth_context'] = auth_context
+
+
+def set_pending_session_cookie():
+    """
+    Sets the session cookie of a new session in the browser. Must be called
+    from the script run, not a callback, as it renders a component.
+    """
+    cookie = st.session_state.pop('session_cookie_pending', None)
+    if cookie is None:
+        return
+
+    session_config = get_session_config()
+    expires_at = datetime.datetime.now() + \
+        datetime.timedelta(seconds=session_config['ttl'])
+    cookie_manager = stx.CookieManager(key='authnyc_cookie_manager')
+    cookie_manager.set(session_config['cookie_name'], cookie,
+                       key='authnyc_session_cookie', expires_at=expires_at)
+
+
+def delete_session():
+    session_id = st.session_state.pop('auth_session_id', None)
+    st.session_state.pop('saved_auth_context', None)
+    st.session_state.pop('session_cookie_pending', None)
+    if session_id is not None:
+        get_session_store().delete(session_id)
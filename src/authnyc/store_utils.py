@@ -0,0 +1,580 @@
+# store_utils.py
+# Description: A Streamlit authentication demonstration application
+# Copyright 2024 Michael Konrad
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# Date: 2026-10-18
+
+import atexit
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+
+from loguru import logger
+from tinydb import TinyDB
+from tinydb.middlewares import CachingMiddleware
+from tinydb.storages import JSONStorage, Storage
+
+
+class NoSyncJSONStorage(JSONStorage):
+    """
+    A JSONStorage which leaves flushing the file to disk up to the OS.
+
+    TinyDB's JSONStorage calls fsync on every write. This storage trades
+    that durability for throughput when the store is opened with
+    fsync = false.
+    """
+
+    def write(self, data):
+        self._handle.seek(0)
+        self._handle.write(json.dumps(data, **self.kwargs))
+        self._handle.flush()
+        self._handle.truncate()
+
+
+class AtomicJSONStorage(Storage):
+    """
+    A JSON file storage which never writes the file in place. Every write
+    goes to a synced temporary file renamed over the database, so a crash
+    mid-write leaves the previous contents whole.
+    """
+
+    def __init__(self, path, **kwargs):
+        self.path = path
+        self.kwargs = kwargs
+
+    def read(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                text = f.read()
+        except FileNotFoundError:
+            return None
+
+        return json.loads(text) if text else None
+
+    def write(self, data):
+        write_file_atomically(self.path, json.dumps(data, **self.kwargs))
+
+
+def write_file_atomically(path, text):
+    """
+    Writes a file by renaming a fully written temporary file over it, so
+    readers see either the old or the new contents and never a mix.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path),
+                                    prefix='.' + os.path.basename(path),
+                                    suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def open_tiny_store(path, indexes=(), write_behind=False, flush_size=100,
+                    flush_interval=5.0, fsync=True, atomic_writes=False):
+    """
+    Opens a TinyDB JSON file as an indexed TinyStore.
+
+    Args:
+        path (string): The path to the JSON database file.
+        indexes (tuple): The document fields to keep hash indexes on.
+        write_behind (bool): Coalesce writes in memory and flush in batches.
+        flush_size (int): The number of writes to buffer before a flush.
+        flush_interval (float): The seconds between background flushes.
+        fsync (bool): Sync the database file to disk on every flush.
+        atomic_writes (bool): Replace the database file on every flush
+                              instead of writing it in place, always synced.
+
+    Returns:
+        TinyStore: The opened store.
+    """
+    if atomic_writes:
+        storage = AtomicJSONStorage
+    else:
+        storage = JSONStorage if fsync else NoSyncJSONStorage
+    if write_behind:
+        storage = CachingMiddleware(storage)
+        storage.WRITE_CACHE_SIZE = flush_size
+        db = TinyDB(path, storage=storage)
+        return TinyStore(db, indexes=indexes, flush_interval=flush_interval)
+
+    return TinyStore(TinyDB(path, storage=storage), indexes=indexes)
+
+
+class TinyStore:
+    """
+    A TinyDB backed document store with in-memory hash indexes.
+
+    All documents are mirrored in memory when the store is opened, so
+    lookups on an indexed field are a dictionary hit and never scan or
+    re-read the underlying JSON file. Writes go through to TinyDB and keep
+    the mirror and the indexes consistent.
+
+    When the database uses TinyDB's CachingMiddleware the store runs in
+    write-behind mode: the middleware flushes after its WRITE_CACHE_SIZE
+    writes, a background thread flushes every flush_interval seconds and
+    any remaining writes are flushed when the process exits.
+
+    Args:
+        db (TinyDB): The TinyDB database to wrap.
+        indexes (tuple): The document fields to keep hash indexes on.
+        flush_interval (float): The seconds between background flushes.
+    """
+
+    def __init__(self, db, indexes=(), flush_interval=None):
+        self.db = db
+        self.records = {}
+        self.indexes = {field: {} for field in indexes}
+        self.write_behind = isinstance(db.storage, CachingMiddleware)
+        self._lock = threading.RLock()
+        self._closed = threading.Event()
+
+        self.reload()
+
+        if self.write_behind:
+            atexit.register(self.close)
+            if flush_interval:
+                threading.Thread(target=self._flush_periodically,
+                                 args=(flush_interval,),
+                                 name='tinystore-flusher',
+                                 daemon=True).start()
+
+    def __len__(self):
+        return len(self.records)
+
+    def reload(self):
+        """
+        Reloads the mirror and the indexes from the JSON file, picking up
+        writes made by other processes since the store was opened.
+        """
+        with self._lock:
+            if self.write_behind:
+                self.db.storage.flush()
+                # Drop the middleware's copy so the file is read again
+                self.db.storage.cache = None
+            # TinyDB caches the next document id, which another process
+            # may have used
+            self.db.table(self.db.default_table_name)._next_id = None
+
+            self.records = {}
+            self.indexes = {field: {} for field in self.indexes}
+            for doc in self.db.all():
+                self.records[doc.doc_id] = dict(doc)
+                self._index(doc.doc_id, doc)
+
+        logger.debug("Loaded {} records, indexes...{}", len(self.records),
+                     list(self.indexes))
+
+    def find(self, field, value):
+        """
+        Finds a document by an indexed field.
+
+        Args:
+            field (string): The indexed field to search on.
+            value (string): The value to search for.
+
+        Returns:
+            dict: A copy of the matching document or None.
+        """
+        doc_id = self._index_for(field).get(value)
+        if doc_id is None:
+            return None
+
+        return dict(self.records[doc_id])
+
+    def insert(self, record):
+        with self._lock:
+            doc_id = self.db.insert(record)
+            self.records[doc_id] = dict(record)
+            self._index(doc_id, record)
+
+        return doc_id
+
+    def insert_many(self, records):
+        records = list(records)
+        with self._lock:
+            doc_ids = self.db.insert_multiple(records)
+            for doc_id, record in zip(doc_ids, records):
+                self.records[doc_id] = dict(record)
+                self._index(doc_id, record)
+
+        return doc_ids
+
+    def update(self, fields, field, value):
+        """
+        Updates the document matching an indexed field.
+
+        Returns:
+            bool: True if a document was updated.
+        """
+        with self._lock:
+            doc_id = self._index_for(field).get(value)
+            if doc_id is None:
+                return False
+
+            self.db.update(fields, doc_ids=[doc_id])
+            self._unindex(doc_id, self.records[doc_id])
+            self.records[doc_id].update(fields)
+            self._index(doc_id, self.records[doc_id])
+
+        return True
+
+    def remove(self, field, value):
+        """
+        Removes the document matching an indexed field.
+
+        Returns:
+            bool: True if a document was removed.
+        """
+        with self._lock:
+            doc_id = self._index_for(field).get(value)
+            if doc_id is None:
+                return False
+
+            self.db.remove(doc_ids=[doc_id])
+            self._unindex(doc_id, self.records.pop(doc_id))
+
+        return True
+
+    def upsert_many(self, records, field):
+        """
+        Inserts or updates documents keyed on an indexed field with a single
+        write for the inserts and a single write for the updates.
+
+        Args:
+            records (iterable): The documents to upsert.
+            field (string): The indexed field identifying a document.
+
+        Returns:
+            tuple: The number of inserted and updated documents.
+        """
+        index = self._index_for(field)
+        with self._lock:
+            inserts = {}
+            changes = {}
+            for record in records:
+                value = record[field]
+                if value in index:
+                    changes.setdefault(value, {}).update(record)
+                else:
+                    inserts.setdefault(value, {}).update(record)
+
+            if changes:
+                targets = {value: index[value] for value in changes}
+                self.db.update(lambda doc: doc.update(changes[doc[field]]),
+                               doc_ids=list(targets.values()))
+                for value, doc_id in targets.items():
+                    self._unindex(doc_id, self.records[doc_id])
+                    self.records[doc_id].update(changes[value])
+                    self._index(doc_id, self.records[doc_id])
+
+            if inserts:
+                self.insert_many(inserts.values())
+
+        return len(inserts), len(changes)
+
+    def all(self):
+        return [dict(record) for record in self.records.values()]
+
+    def iter_all(self, batch_size=1000):
+        """
+        Yields a copy of every document in insertion order. TinyDB keeps
+        the whole store in memory, so batch_size is accepted only for
+        compatibility with SQLiteStore.
+        """
+        for doc_id in list(self.records):
+            record = self.records.get(doc_id)
+            if record is not None:
+                yield dict(record)
+
+    def flush(self):
+        """
+        Writes any buffered write-behind changes to disk.
+        """
+        if self.write_behind:
+            with self._lock:
+                self.db.storage.flush()
+
+    def close(self):
+        if not self._closed.is_set():
+            self._closed.set()
+            with self._lock:
+                self.db.close()
+
+    def _flush_periodically(self, flush_interval):
+        while not self._closed.wait(flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error("Store flush failed...{}", e)
+
+    def _index_for(self, field):
+        if field not in self.indexes:
+            raise KeyError(f"Field {field} is not indexed.")
+        return self.indexes[field]
+
+    def _index(self, doc_id, record):
+        for field, index in self.indexes.items():
+            value = record.get(field)
+            if value:
+                index[value] = doc_id
+
+    def _unindex(self, doc_id, record):
+        for field, index in self.indexes.items():
+            value = record.get(field)
+            if value and index.get(value) == doc_id:
+                del index[value]
+
+
+class SQLiteStore:
+    """
+    A SQLite backed document store with indexed columns.
+
+    Each store is a table in a shared SQLite database running in WAL mode,
+    so several Streamlit worker processes can read and write the same
+    stores concurrently. Documents are kept as JSON, and every indexed
+    field is also kept in its own indexed column for lookups. The interface
+    matches TinyStore.
+
+    Args:
+        path (string): The path to the SQLite database file.
+        table (string): The table holding the documents.
+        indexes (tuple): The document fields to keep indexed columns for.
+        fsync (bool): Run with synchronous=FULL instead of NORMAL.
+    """
+
+    write_behind = False
+
+    def __init__(self, path, table, indexes=(), fsync=True):
+        self.path = path
+        self.table = table
+        self.indexes = tuple(indexes)
+        self._lock = threading.RLock()
+
+        self.db = sqlite3.connect(path, timeout=30, isolation_level=None,
+                                  check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous={}".format(
+            'FULL' if fsync else 'NORMAL'))
+
+        columns = ''.join(f", {field} TEXT" for field in self.indexes)
+        with self._lock:
+            self.db.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} "
+                f"(doc_id INTEGER PRIMARY KEY AUTOINCREMENT{columns}, "
+                f"data TEXT NOT NULL)")
+            # Add columns for fields indexed after the table was created
+            existing = {row[1] for row in
+                        self.db.execute(f"PRAGMA table_info({table})")}
+            for field in self.indexes:
+                if field not in existing:
+                    self.db.execute(
+                        f"ALTER TABLE {table} ADD COLUMN {field} TEXT")
+                    self.db.execute(
+                        f"UPDATE {table} SET {field} = "
+                        f"json_extract(data, '$.{field}')")
+                self.db.execute(
+                    f"CREATE INDEX IF NOT EXISTS {table}_{field}_idx "
+                    f"ON {table} ({field})")
+
+    def __len__(self):
+        with self._lock:
+            row = self.db.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        return row[0]
+
+    def find(self, field, value):
+        """
+        Finds the newest document by an indexed field.
+
+        Args:
+            field (string): The indexed field to search on.
+            value (string): The value to search for.
+
+        Returns:
+            dict: The matching document or None.
+        """
+        row = self._find_row(field, value)
+        if row is None:
+            return None
+
+        return json.loads(row[1])
+
+    def insert(self, record):
+        with self._lock:
+            cursor = self.db.execute(self._insert_sql(), self._row(record))
+
+        return cursor.lastrowid
+
+    def insert_many(self, records):
+        with self._lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                self.db.executemany(self._insert_sql(),
+                                    (self._row(record) for record in records))
+            except Exception:
+                self.db.execute("ROLLBACK")
+                raise
+            self.db.execute("COMMIT")
+
+    def update(self, fields, field, value):
+        """
+        Updates the newest document matching an indexed field.
+
+        Returns:
+            bool: True if a document was updated.
+        """
+        with self._lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._find_row(field, value)
+                if row is not None:
+                    record = json.loads(row[1])
+                    record.update(fields)
+                    self._update_row(row[0], record)
+            except Exception:
+                self.db.execute("ROLLBACK")
+                raise
+            self.db.execute("COMMIT")
+
+        return row is not None
+
+    def upsert_many(self, records, field):
+        """
+        Inserts or updates documents keyed on an indexed field in a single
+        transaction.
+
+        Args:
+            records (iterable): The documents to upsert.
+            field (string): The indexed field identifying a document.
+
+        Returns:
+            tuple: The number of inserted and updated documents.
+        """
+        inserted = 0
+        updated = 0
+        with self._lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                for record in records:
+                    row = self._find_row(field, record[field])
+                    if row is None:
+                        self.db.execute(self._insert_sql(), self._row(record))
+                        inserted += 1
+                    else:
+                        merged = json.loads(row[1])
+                        merged.update(record)
+                        self._update_row(row[0], merged)
+                        updated += 1
+            except Exception:
+                self.db.execute("ROLLBACK")
+                raise
+            self.db.execute("COMMIT")
+
+        return inserted, updated
+
+    def remove(self, field, value):
+        """
+        Removes the newest document matching an indexed field.
+
+        Returns:
+            bool: True if a document was removed.
+        """
+        with self._lock:
+            row = self._find_row(field, value)
+            if row is None:
+                return False
+
+            self.db.execute(f"DELETE FROM {self.table} WHERE doc_id = ?",
+                            (row[0],))
+
+        return True
+
+    def clear(self):
+        """
+        Removes every document, leaving the table to connections other
+        stores hold open.
+        """
+        with self._lock:
+            self.db.execute(f"DELETE FROM {self.table}")
+
+    def all(self):
+        with self._lock:
+            rows = self.db.execute(
+                f"SELECT data FROM {self.table} ORDER BY doc_id").fetchall()
+
+        return [json.loads(row[0]) for row in rows]
+
+    def iter_all(self, batch_size=1000):
+        """
+        Yields every document in insertion order, reading batch_size rows
+        at a time so the table is never loaded into memory at once.
+        """
+        last_doc_id = 0
+        while True:
+            with self._lock:
+                rows = self.db.execute(
+                    f"SELECT doc_id, data FROM {self.table} WHERE doc_id > ? "
+                    f"ORDER BY doc_id LIMIT ?",
+                    (last_doc_id, batch_size)).fetchall()
+            if not rows:
+                return
+
+            for row in rows:
+                yield json.loads(row[1])
+            last_doc_id = rows[-1][0]
+
+    def reload(self):
+        """
+        Reads always go to the database, so there is nothing to reload.
+        """
+
+    def flush(self):
+        pass
+
+    def close(self):
+        with self._lock:
+            self.db.close()
+
+    def _find_row(self, field, value):
+        if field not in self.indexes:
+            raise KeyError(f"Field {field} is not indexed.")
+
+        with self._lock:
+            return self.db.execute(
+                f"SELECT doc_id, data FROM {self.table} WHERE {field} = ? "
+                f"ORDER BY doc_id DESC LIMIT 1", (value,)).fetchone()
+
+    def _update_row(self, doc_id, record):
+        assignments = ''.join(f"{field} = ?, " for field in self.indexes)
+        self.db.execute(
+            f"UPDATE {self.table} SET {assignments}data = ? WHERE doc_id = ?",
+            self._row(record) + (doc_id,))
+
+    def _insert_sql(self):
+        columns = ''.join(f"{field}, " for field in self.indexes)
+        params = '?, ' * len(self.indexes)
+        return f"INSERT INTO {self.table} ({columns}data) VALUES ({params}?)"
+
+    def _row(self, record):
+        values = tuple(record.get(field) for field in self.indexes)
+        return values + (json.dumps(record),)
@@ -0,0 +1,222 @@
+# token_utils.py
+# Description: A Streamlit authentication demonstration application
+# Copyright 2024 Michael Konrad
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# Date: 2026-10-18
+
+import date_utils as du
+import metrics_utils as metrics
+import secrets
+import streamlit as st
+import sys
+import threading
+import time
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from loguru import logger
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+
+# Seconds before expires_at at which a session's token is refreshed
+TOKEN_REFRESH_AHEAD = 300
+
+# Seconds a rerun waits for a refresh when the token has already expired
+TOKEN_REFRESH_TIMEOUT = 10
+
+# In-flight refreshes keyed by Streamlit session id
+_refreshes = {}
+_refresh_lock = threading.Lock()
+_refresh_executor = ThreadPoolExecutor(max_workers=4,
+                                       thread_name_prefix='token-refresh')
+
+# Maximum raw token responses kept server-side, least recently used are
+# evicted first
+TOKEN_CACHE_SIZE = 25000
+
+# Raw token responses keyed by session handle
+_token_cache = OrderedDict()
+_token_cache_lock = threading.Lock()
+
+TOKEN_CACHE_ENTRIES = metrics.gauge('authnyc_token_cache_entries',
+                                    "Token responses in the token cache.")
+
+
+@dataclass(frozen=True, slots=True)
+class AuthContext:
+    """
+    The authentication state kept in a session. The raw token response,
+    with its access, id and refresh tokens, stays in the server-side token
+    cache under handle.
+    """
+    handle: str
+    expires_at: float
+    refreshable: bool
+
+
+def create_auth_context(token, handle=None):
+    """
+    Caches a token response server-side and returns the session's context
+    referencing it.
+
+    Args:
+        token (dict): The token response.
+        handle (string): The handle to replace, a new one if not given.
+
+    Returns:
+        AuthContext: The session auth context.
+    """
+    handle = handle or secrets.token_urlsafe(16)
+    with _token_cache_lock:
+        _token_cache[handle] = token
+        _token_cache.move_to_end(handle)
+        while len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+        TOKEN_CACHE_ENTRIES.set(len(_token_cache))
+
+    return AuthContext(handle, token.get('expires_at', 0),
+                       bool(token.get('refresh_token')))
+
+
+def get_session_token():
+    """
+    Returns the raw token response of the session, or None when the session
+    is not logged in or its token was evicted.
+    """
+    auth_context = st.session_state.get('auth_context')
+    if auth_context is None:
+        return None
+
+    with _token_cache_lock:
+        token = _token_cache.get(auth_context.handle)
+        if token is not None:
+            _token_cache.move_to_end(auth_context.handle)
+
+    return token
+
+
+def discard_session_token():
+    auth_context = st.session_state.get('auth_context')
+    if auth_context is not None:
+        with _token_cache_lock:
+            _token_cache.pop(auth_context.handle, None)
+            TOKEN_CACHE_ENTRIES.set(len(_token_cache))
+
+
+def get_session_memory():
+    """
+    Returns the approximate bytes held by the session's auth state, the
+    auth context and the user claims.
+    """
+    return sum(get_object_size(st.session_state.get(key))
+               for key in ('auth_context', 'user_record', 'authenticated'))
+
+
+def get_object_size(value):
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(get_object_size(k) + get_object_size(v)
+                    for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(get_object_size(v) for v in value)
+    elif hasattr(value, '__slots__'):
+        size += sum(get_object_size(getattr(value, slot))
+                    for slot in value.__slots__)
+
+    return size
+
+
+def get_session_id():
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        raise RuntimeError("Unable to get script context.")
+
+    return ctx.session_id
+
+
+def refresh_session_token(authenticator):
+    """
+    Keeps the session's token fresh with its refresh_token.
+
+    Once the token is within TOKEN_REFRESH_AHEAD seconds of expiring a
+    refresh is started on a background thread, at most one per session.
+    A later rerun swaps in the refreshed token. If the token has already
+    expired the rerun waits for the refresh instead.
+
+    The refresh fails when the session's token was evicted from the token
+    cache.
+
+    Args:
+        authenticator (OAuth2Component): The session's token authenticator.
+
+    Returns:
+        bool: False if the token expired and could not be refreshed.
+    """
+    auth_context = st.session_state.get('auth_context')
+    if auth_context is None or not auth_context.expires_at:
+        return True
+
+    expired = auth_context.expires_at <= time.time()
+    if not auth_context.refreshable:
+        return not expired
+
+    token = get_session_token()
+    if token is None:
+        logger.warning("Session token was evicted from the token cache.")
+        return False
+
+    session_id = get_session_id()
+    with _refresh_lock:
+        future = _refreshes.get(session_id)
+        if future is None:
+            if auth_context.expires_at - time.time() > TOKEN_REFRESH_AHEAD:
+                return True
+            logger.info("Refreshing token for session...{}", session_id)
+            future = _refresh_executor.submit(authenticator.refresh_token,
+                                              token, force=True)
+            _refreshes[session_id] = future
+
+    if not (future.done() or expired):
+        return True
+
+    try:
+        refreshed = future.result(timeout=TOKEN_REFRESH_TIMEOUT)
+    except Exception as e:
+        logger.error("Token refresh failed...{}", e)
+        return not expired
+    finally:
+        # A refresh still running after the timeout is left in place, as a
+        # second one would reuse the same refresh_token
+        with _refresh_lock:
+            if future.done() and _refreshes.get(session_id) is future:
+                del _refreshes[session_id]
+
+    st.session_state['auth_context'] = create_auth_context(
+        merge_refreshed_token(token, refreshed), auth_context.handle)
+    logger.debug("Token refreshed, expires at...{}",
+                 du.convert_epoch(refreshed['expires_at']))
+
+    return True
+
+
+def merge_refreshed_token(token, refreshed):
+    """
+    Carries over the refresh and id tokens a refresh response may omit.
+    """
+    merged = dict(refreshed)
+    for key in ('refresh_token', 'id_token'):
+        if key not in merged and key in token:
+            merged[key] = token[key]
+
+    return merged
@@ -0,0 +1,186 @@
+# user_cli.py
+# Description: A Streamlit authentication demonstration application
+# Copyright 2024 Michael Konrad
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# Date: 2026-10-18
+#
+# Streaming JSONL import and export of the local user store.
+#
+# USAGE: python src/authnyc/user_cli.py import users.jsonl [--chunk-size N]
+#        python src/authnyc/user_cli.py export users.jsonl
+
+import argparse
+import date_utils as du
+import itertools
+import json
+import sys
+import time
+import uuid
+
+from datetime import datetime
+from loguru import logger
+from user_utils import get_claims_digest, get_user_db
+
+
+def read_user_records(lines):
+    """
+    Parses user records from JSONL lines, skipping blank lines.
+
+    Args:
+        lines (iterable): The JSONL lines.
+
+    Yields:
+        dict: The user records.
+    """
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid user record on line {line_number}.") \
+                from e
+
+
+def prepare_user_record(user_record, found_record):
+    """
+    Fills in the local store attributes of an imported user record.
+
+    Args:
+        user_record (dict): The imported user record.
+        found_record (dict): The stored user record or None.
+
+    Returns:
+        dict: The user record ready to upsert.
+    """
+    date_format = '%Y-%m-%d %H:%M:%S'
+    now = du.convert_date(datetime.now(), format=date_format)
+
+    if found_record is None:
+        user_record.setdefault('id', str(uuid.uuid4()))
+        user_record.setdefault('inserted_at', now)
+        user_record.setdefault('updated_at', now)
+        claims = user_record
+    else:
+        user_record['id'] = found_record['id']
+        user_record['inserted_at'] = found_record['inserted_at']
+        user_record['updated_at'] = now
+        claims = {**found_record, **user_record}
+
+    user_record['claims_digest'] = get_claims_digest(claims)
+
+    return user_record
+
+
+def import_users(lines, user_db, key='email', chunk_size=1000):
+    """
+    Upserts user records from JSONL lines in chunks of chunk_size records,
+    so only one chunk is held in memory at a time.
+
+    Returns:
+        tuple: The number of inserted and updated user records.
+    """
+    inserted = 0
+    updated = 0
+    started = time.perf_counter()
+    records = read_user_records(lines)
+
+    while chunk := list(itertools.islice(records, chunk_size)):
+        for user_record in chunk:
+            if not user_record.get(key):
+                raise ValueError(f"User record is missing {key}.")
+            prepare_user_record(user_record, user_db.find(key, user_record[key]))
+
+        chunk_inserted, chunk_updated = user_db.upsert_many(chunk, key)
+        inserted += chunk_inserted
+        updated += chunk_updated
+
+        elapsed = time.perf_counter() - started
+        logger.info("Imported {} users, {} inserted, {} updated "
+                    "({:.0f} users/s)", inserted + updated, inserted,
+                    updated, (inserted + updated) / max(elapsed, 1e-9))
+
+    user_db.flush()
+
+    return inserted, updated
+
+
+def export_users(out, user_db, progress_every=10000):
+    """
+    Streams every user record to out as JSONL.
+
+    Returns:
+        int: The number of exported user records.
+    """
+    exported = 0
+    started = time.perf_counter()
+
+    for user_record in user_db.iter_all():
+        out.write(json.dumps(user_record) + '\n')
+        exported += 1
+        if exported % progress_every == 0:
+            elapsed = time.perf_counter() - started
+            logger.info("Exported {} users ({:.0f} users/s)", exported,
+                        exported / max(elapsed, 1e-9))
+
+    elapsed = time.perf_counter() - started
+    logger.info("Exported {} users in {:.2f}s", exported, elapsed)
+
+    return exported
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Import and export the Authnyc! user store as JSONL.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = commands.add_parser('import', help="upsert users")
+    import_parser.add_argument('path', help="JSONL file, - for stdin")
+    import_parser.add_argument('--key', default='email',
+                               choices=['email', 'sub'],
+                               help="attribute identifying a user")
+    import_parser.add_argument('--chunk-size', type=int, default=1000,
+                               help="users upserted per write")
+
+    export_parser = commands.add_parser(
+        'export', help="export users",
+        description="Export users as JSONL. Memory is bounded only with the "
+                    "sqlite storage backend, a tinydb store is held in "
+                    "memory whole.")
+    export_parser.add_argument('path', help="JSONL file, - for stdout")
+
+    args = parser.parse_args(argv)
+
+    user_db = get_user_db()
+    try:
+        if args.command == 'import':
+            if args.path == '-':
+                import_users(sys.stdin, user_db, args.key, args.chunk_size)
+            else:
+                with open(args.path, encoding='utf-8') as f:
+                    import_users(f, user_db, args.key, args.chunk_size)
+        else:
+            if args.path == '-':
+                export_users(sys.stdout, user_db)
+            else:
+                with open(args.path, 'w', encoding='utf-8') as f:
+                    export_users(f, user_db)
+    finally:
+        user_db.close()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
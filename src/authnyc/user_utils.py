@@ -16,46 +16,109 @@
 
 import date_utils as du
 import base64
+import hashlib
 import json
-import os
+import metrics_utils as metrics
+import threading
+import time
 import uuid
 import streamlit as st
 
-from tinydb import TinyDB, Query
+from collections import OrderedDict
+from common_utils import open_store
+from dataclasses import dataclass
 from loguru import logger
+from metrics_utils import timed
+
+
+# OIDC claims kept on the local user record
+CLAIM_KEYS = ("sub", "name", "nickname", "given_name", "family_name", "email",
+              "phone_number", "amr")
+
+SKIPPED_WRITES = metrics.counter('authnyc_store_skipped_writes_total',
+                                 "Store writes skipped as the document was "
+                                 "unchanged.", labels=('store',))
+
+# Number of verified id_tokens whose user claims are kept in memory
+CLAIMS_CACHE_SIZE = 1024
+
+# User claims of verified id_tokens keyed by token digest, least recently
+# used first
+_claims_cache = OrderedDict()
+_claims_lock = threading.Lock()
+
+
+@dataclass(frozen=True, slots=True)
+class UserClaims:
+    """
+    The OIDC claims of a user as kept in the session. Claims are read by
+    key like the user record dictionary they replace.
+    """
+    sub: str = ''
+    name: str = ''
+    nickname: str = ''
+    given_name: str = ''
+    family_name: str = ''
+    email: str = ''
+    phone_number: str = ''
+    amr: tuple = ()
+
+    @classmethod
+    def from_claims(cls, claims):
+        values = {key: claims[key] for key in CLAIM_KEYS if key in claims}
+        if 'amr' in values:
+            values['amr'] = tuple(values['amr'])
+
+        return cls(**values)
+
+    def __getitem__(self, key):
+        if key not in CLAIM_KEYS:
+            raise KeyError(key)
+
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in CLAIM_KEYS
+
+    def get(self, key, default=None):
+        return self[key] if key in CLAIM_KEYS else default
+
+    def to_dict(self):
+        user_record = {key: getattr(self, key) for key in CLAIM_KEYS}
+        user_record['amr'] = list(self.amr)
+
+        return user_record
 
 
 @st.cache_resource
 def get_user_db():
-    user_db_file = r'user_db.json'
-    user_db_path = os.path.join(os.getcwd(), user_db_file)
-
-    db = TinyDB(user_db_path)
+    db = open_store('user')
 
     return db
 
 
+@timed('finduser')
 def finduser(email):
     logger.debug("Searching for user...{}", email)
 
     user_db = get_user_db()
 
-    User = Query()
-    user_record = user_db.search(User.email == email)
-    if user_record == []:
-        logger.info("User not found, search result...{}", user_record)
-        user_record = None
+    user_record = user_db.find('email', email)
+    if user_record is None:
+        logger.info("User not found...{}", email)
     else:
-        logger.debug("User found...{}", user_record[0])
-        user_record = dict(user_record[0])
+        logger.debug("User found...{}", user_record)
 
     return user_record
 
 
-def adduser(id_token):
-    payload = id_token.split(".")[1] + "=="
-
-    user_record = get_payload_data(payload)
+@timed('adduser')
+def adduser(id_token, claims=None):
+    if claims is None:
+        payload = id_token.split(".")[1] + "=="
+        user_record = get_payload_data(payload)
+    else:
+        user_record = get_claims_data(claims)
 
     if 'email' in user_record:
         email = user_record['email']
@@ -69,6 +132,7 @@ def adduser(id_token):
             user_record['id'] = id
             user_record['inserted_at'] = inserted_at
             user_record['updated_at'] = inserted_at
+            user_record['claims_digest'] = get_claims_digest(user_record)
         
             logger.debug("Adding user to user store...{}", user_record)
             user_db = get_user_db()
@@ -77,7 +141,7 @@ def adduser(id_token):
             # Update existing record with any changes from OIDC
             user_record = update_local_user_record(user_record, found_record)
 
-        return user_record
+        return UserClaims.from_claims(user_record)
     
     else:
         raise RuntimeError("Missing required attribute email.")
@@ -86,7 +150,7 @@ def adduser(id_token):
 def update_auth0_user(updated_user_record, auth0_mgmt_api):
     id = updated_user_record['sub']
     del updated_user_record['sub']
-    result = auth0_mgmt_api.users.update(id, updated_user_record)
+    result = auth0_mgmt_api.update_user(id, updated_user_record)
     logger.debug("Updated Auth0 user result...{}", result)
 
 
@@ -94,48 +158,86 @@ def get_payload_data(payload):
     decoded_payload = json.loads(base64.urlsafe_b64decode(payload))
     logger.debug("Payload...{}", decoded_payload)
 
-    sub = ''
-    name = ''
-    nickname = ''
-    given_name = ''
-    family_name = ''
-    email = ''
-    phone_number = ''
-    amr = []
-    if 'sub' in decoded_payload:
-        sub = decoded_payload['sub']
-    if 'name' in decoded_payload:
-        name = decoded_payload['name']
-    if 'nickname' in decoded_payload:
-        nickname = decoded_payload['nickname']
-    if 'given_name' in decoded_payload:
-        given_name = decoded_payload['given_name']
-    if 'family_name' in decoded_payload:
-        family_name = decoded_payload['family_name']
-    if 'email' in decoded_payload:
-        email = decoded_payload['email']
-    if 'phone_number' in decoded_payload:
-        phone_number = decoded_payload['phone_number']
-    if 'amr' in decoded_payload:
-        amr = decoded_payload['amr']
-
-    user_record = {
-        "sub": sub,
-        "name": name,
-        "nickname": nickname,
-        "given_name": given_name,
-        "family_name": family_name,
-        "email": email,
-        "phone_number": phone_number,
-        "amr": amr
-    }
+    return get_claims_data(decoded_payload)
+
+
+def get_claims_data(decoded_payload):
+    return UserClaims.from_claims(decoded_payload).to_dict()
+
+
+def get_token_digest(id_token):
+    return hashlib.sha256(id_token.encode('utf-8')).hexdigest()
+
+
+def get_cached_claims(id_token):
+    """
+    Returns the user claims of an id_token verified earlier, while the token
+    has not expired.
+
+    Args:
+        id_token (string): The encoded id_token.
+
+    Returns:
+        UserClaims: The user claims or None.
+    """
+    token_digest = get_token_digest(id_token)
+    with _claims_lock:
+        cached = _claims_cache.get(token_digest)
+        if cached is None:
+            return None
+        if time.time() >= cached[1]:
+            del _claims_cache[token_digest]
+            return None
+        _claims_cache.move_to_end(token_digest)
+
+    return cached[0]
 
-    return user_record
+
+def cache_claims(id_token, user_claims, expires_at):
+    """
+    Keeps the user claims of a verified id_token until it expires, evicting
+    the least recently used tokens beyond CLAIMS_CACHE_SIZE.
+
+    Args:
+        id_token (string): The encoded id_token.
+        user_claims (UserClaims): The user claims.
+        expires_at (float): The epoch time the token expires.
+    """
+    token_digest = get_token_digest(id_token)
+    with _claims_lock:
+        _claims_cache[token_digest] = (user_claims, expires_at)
+        _claims_cache.move_to_end(token_digest)
+        while len(_claims_cache) > CLAIMS_CACHE_SIZE:
+            _claims_cache.popitem(last=False)
+
+
+def get_claims_digest(user_record):
+    """
+    Creates a digest of the OIDC claims held in a user record.
+
+    Args:
+        user_record (dict): The user record.
+
+    Returns:
+        string: The hex encoded SHA-256 digest of the claims.
+    """
+    claims = {key: user_record.get(key) for key in CLAIM_KEYS}
+    serialized = json.dumps(claims, sort_keys=True, separators=(',', ':'))
+
+    return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
 
 
 def update_local_user_record(user_record, found_record):
+    claims_digest = get_claims_digest(user_record)
+    if found_record.get('claims_digest') == claims_digest:
+        # Nothing changed at the provider, skip the write
+        SKIPPED_WRITES.inc(store='user')
+        logger.debug("User claims unchanged, skipped write...{}",
+                     found_record['email'])
+        return found_record
+
     user_db = get_user_db()
-    
+
     email = found_record['email']
     id = found_record['id']
     inserted_at = found_record['inserted_at']
@@ -146,8 +248,8 @@ def update_local_user_record(user_record, found_record):
     user_record['id'] = id
     user_record['inserted_at'] = inserted_at
     user_record['updated_at'] = updated_at
+    user_record['claims_digest'] = claims_digest
 
-    User = Query()
-    user_db.update(user_record, User.email == email)
+    user_db.update(user_record, 'email', email)
     #logger.debug("User store updated...{}", user_db.all())
     return user_record
\ No newline at end of file
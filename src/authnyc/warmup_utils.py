@@ -0,0 +1,216 @@
+# warmup_utils.py
+# Description: A Streamlit authentication demonstration application
+# Copyright 2024 Michael Konrad
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# Date: 2026-10-18
+#
+# Fills the process caches before sessions are served.
+#
+# USAGE: python src/authnyc/warmup_utils.py [--check]
+#
+# Without options the stages are run and timed in this process. With
+# --check the exit status tells whether the running server is ready.
+
+import argparse
+import auth_utils as auth
+import json
+import metrics_utils as metrics
+import oidc_utils as oidc
+import os
+import sys
+import threading
+import time
+
+from common_utils import get_base_configuration, get_config_db
+from common_utils import get_configuration, is_configured
+from common_utils import write_file_atomically
+from loguru import logger
+from prefetch_utils import prefetch_providers
+from user_utils import get_user_db
+
+
+# File, relative to the working directory, written once warm-up succeeds
+READY_FILE = r'authnyc.ready'
+
+# Attempts made at each warm-up stage before warm-up gives up
+WARM_UP_ATTEMPTS = 5
+
+# Seconds before a failed stage is retried, doubled for each retry up to
+# the maximum
+WARM_UP_RETRY_DELAY = 1.0
+WARM_UP_MAX_RETRY_DELAY = 30.0
+
+_ready = False
+_warm_up_lock = threading.Lock()
+_warm_up_started = False
+
+
+def is_ready():
+    return _ready
+
+
+metrics.set_readiness_check(is_ready)
+
+
+def get_ready_path():
+    return os.path.join(os.getcwd(), READY_FILE)
+
+
+def load_stores():
+    get_config_db()
+    get_user_db()
+    oidc.get_oidc_db()
+    oidc.get_provider_registry()
+
+
+def build_token_authenticator():
+    app_config = get_configuration()
+    auth.get_token_authenticator(app_config['oidc_provider_key'])
+
+
+def prefetch_discovery():
+    failed = [result['provider'] for result in prefetch_providers()
+              if result['error'] is not None]
+    if failed:
+        raise RuntimeError(f"Prefetch failed for {', '.join(failed)}.")
+
+
+def get_warm_up_stages():
+    stages = [
+        ('configuration_file', get_base_configuration),
+        ('stores', load_stores),
+    ]
+    if is_configured():
+        stages += [
+            ('configuration', get_configuration),
+            ('discovery', prefetch_discovery),
+            ('management_token', auth.get_auth0_api_authenticator),
+            ('token_authenticator', build_token_authenticator),
+        ]
+
+    return stages
+
+
+def warm_up(mark_ready=True, attempts=None):
+    """
+    Runs each cold path once so the first session finds the configuration,
+    stores, discovery documents, JWKS, management token and token
+    authenticator cached. Each stage is timed, and a failed stage is
+    retried with exponential backoff up to attempts times.
+
+    Only once every stage has succeeded is the process marked ready and the
+    ready file written with the stage timings.
+
+    Args:
+        mark_ready (bool): Write the ready file, False when only timing.
+        attempts (int): Attempts per stage, defaults to WARM_UP_ATTEMPTS.
+
+    Returns:
+        dict: The seconds taken and any error keyed by stage.
+    """
+    global _ready
+
+    if attempts is None:
+        attempts = WARM_UP_ATTEMPTS
+
+    ready_path = get_ready_path()
+    if mark_ready and os.path.exists(ready_path):
+        os.remove(ready_path)
+
+    started = time.perf_counter()
+    stages = {}
+    for name, stage in get_warm_up_stages():
+        stage_started = time.perf_counter()
+        for attempt in range(1, attempts + 1):
+            error = None
+            try:
+                stage()
+                break
+            except Exception as e:
+                error = repr(e)
+                logger.warning("Warm-up stage {} failed, attempt {}...{}",
+                               name, attempt, e)
+            if attempt < attempts:
+                time.sleep(min(WARM_UP_RETRY_DELAY * 2 ** (attempt - 1),
+                               WARM_UP_MAX_RETRY_DELAY))
+        stages[name] = {'seconds': time.perf_counter() - stage_started,
+                        'error': error}
+        logger.info("Warm-up stage {} took {:.3f}s", name,
+                    stages[name]['seconds'])
+
+    total = time.perf_counter() - started
+    failed = [name for name, stage in stages.items() if stage['error']]
+    if failed:
+        logger.error("Warm-up failed in {:.3f}s, not ready...{}", total,
+                     failed)
+    else:
+        logger.info("Warm-up finished in {:.3f}s", total)
+    if mark_ready and not failed:
+        write_file_atomically(ready_path, json.dumps({
+            'pid': os.getpid(),
+            'seconds': total,
+            'stages': stages,
+        }, indent=2))
+        _ready = True
+
+    return stages
+
+
+def start_warm_up():
+    """
+    Starts the warm-up on a background thread, once per server process, so
+    no session waits for it. Until it succeeds sessions take the cold paths
+    themselves and /ready answers 503.
+    """
+    global _warm_up_started
+
+    with _warm_up_lock:
+        if _warm_up_started:
+            return
+        _warm_up_started = True
+
+    threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
+
+
+def check_ready():
+    """
+    Checks the ready file was written by a process which is still running.
+    """
+    try:
+        with open(get_ready_path(), encoding='utf-8') as f:
+            pid = json.load(f)['pid']
+        os.kill(pid, 0)
+    except (OSError, ValueError, KeyError):
+        return False
+
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Warm up the Authnyc! caches or check readiness.")
+    parser.add_argument('--check', action='store_true',
+                        help="exit 0 if the running server is ready")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        return 0 if check_ready() else 1
+
+    for name, stage in warm_up(mark_ready=False, attempts=1).items():
+        print(f"{name:20} {stage['seconds']:8.3f}s  {stage['error'] or ''}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+# test_auth_utils.py
+# Description: A Streamlit authentication demonstration application
+# Copyright 2024 Michael Konrad
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# Date: 2026-10-18
+
+import pytest
+import threading
+import time
+
+from authnyc import auth_utils as au
+from types import SimpleNamespace
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(au, 'time', SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+@pytest.fixture
+def mgmt_tokens(monkeypatch, clock):
+    monkeypatch.setattr(au, '_mgmt_api_clients', {})
+    monkeypatch.setattr(au, 'is_configured', lambda: True)
+    monkeypatch.setattr(au, 'get_configuration',
+                        lambda: {'oidc_api_provider_key': 'api'})
+    monkeypatch.setattr(au.oidc, 'get_provider_config', lambda key: {
+        'config': {'provider': {
+            'api_domain': 'tenant.example.com', 'api_client_id': 'id',
+            'api_client_secret': 'secret',
+            'api_audience': 'https://{}/api/v2/'}}})
+    fetched = []
+
+    def get_client_credentials_token(domain, client_id, client_secret,
+                                     audience):
+        fetched.append(audience)
+        # Give other threads the chance to race the fetch
+        time.sleep(0.05)
+        return {'access_token': f'token-{len(fetched)}', 'expires_in': 3600}
+
+    monkeypatch.setattr(au, 'get_client_credentials_token',
+                        get_client_credentials_token)
+    return fetched
+
+
+def test_mgmt_token_reused_until_refresh(mgmt_tokens, clock):
+    client = au.get_auth0_api_authenticator()
+    assert mgmt_tokens == ['https://tenant.example.com/api/v2/']
+
+    clock[0] += 3600 - au.MGMT_TOKEN_REFRESH_MARGIN - 1
+    assert au.get_auth0_api_authenticator() is client
+    assert len(mgmt_tokens) == 1
+
+    clock[0] += 1
+    assert au.get_auth0_api_authenticator() is not client
+    assert len(mgmt_tokens) == 2
+
+
+def test_mgmt_token_fetched_once_across_threads(mgmt_tokens):
+    clients = []
+    threads = [threading.Thread(
+        target=lambda: clients.append(au.get_auth0_api_authenticator()))
+        for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(mgmt_tokens) == 1
+    assert len(clients) == 8
+    assert all(client is clients[0] for client in clients)
+
+
+def test_token_authenticator_built_once_per_provider(monkeypatch):
+    monkeypatch.setattr(au, '_token_authenticators', {})
+    built = []
+
+    def create_token_authenticator(provider_key):
+        built.append(provider_key)
+        # Give other threads the chance to race the build
+        time.sleep(0.05)
+        return object()
+
+    monkeypatch.setattr(au, 'create_token_authenticator',
+                        create_token_authenticator)
+    authenticators = []
+    threads = [threading.Thread(target=lambda: authenticators.append(
+        au.get_token_authenticator('a'))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert built == ['a']
+    assert all(a is authenticators[0] for a in authenticators)
+    assert au.get_token_authenticator('b') is not authenticators[0]
+    assert built == ['a', 'b']
+
+    au.oidc.notify_provider_change('b')
+    assert au.get_token_authenticator('a') is authenticators[0]
+    au.get_token_authenticator('b')
+    assert built == ['a', 'b', 'b']
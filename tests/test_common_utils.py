@@ -24,4 +24,149 @@ logger = logging.getLogger(__name__)
 def test_validate_config():
     config = cu.initialize_config()
     assert config is not None
-    assert cu.validate_config(config) == True
\ No newline at end of file
+    assert cu.validate_config(config) == True
+
+def test_base_configuration_reloads_on_change(tmp_path, monkeypatch):
+    config_path = tmp_path / 'authnyc.toml'
+    config_path.write_text("[config]\noidc_provider_configured = false\n")
+    monkeypatch.setattr(cu, 'get_base_configuration_path',
+                        lambda: str(config_path))
+
+    authnyc = cu.get_base_configuration()
+    assert cu.get_base_configuration() is authnyc
+    assert cu.is_configured() == False
+
+    config_path.write_text("[config]\noidc_provider_configured = true\n")
+    assert cu.get_base_configuration() is not authnyc
+    assert cu.is_configured() == True
+
+
+def test_write_base_configuration_bumps_sequence(tmp_path, monkeypatch):
+    config_path = tmp_path / 'authnyc.toml'
+    config_path.write_text("[config]\n# keep me\n"
+                           "oidc_provider_configured = false\n"
+                           "config_seq = 4\n")
+    monkeypatch.setattr(cu, 'get_base_configuration_path',
+                        lambda: str(config_path))
+
+    def configure(authnyc):
+        authnyc['config']['oidc_provider_configured'] = True
+
+    with cu.config_lock():
+        cu.write_base_configuration(configure)
+
+    text = config_path.read_text()
+    assert text.startswith("[config]\n# keep me\n")
+    assert "oidc_provider_configured = true\nconfig_seq = 5\n" in text
+    assert cu.get_config_seq() == 5
+    assert list(tmp_path.glob('*.tmp')) == []
+
+
+@pytest.mark.parametrize('backend', ['tinydb', 'sqlite'])
+def test_commit_configuration_versions(tmp_path, monkeypatch, backend):
+    from authnyc import store_utils as su
+
+    config_path = tmp_path / 'authnyc.toml'
+    config_path.write_text("[config]\noidc_provider_configured = true\n"
+                           "[config_store]\nretain_versions = 2\n")
+    monkeypatch.setattr(cu, 'get_base_configuration_path',
+                        lambda: str(config_path))
+    if backend == 'tinydb':
+        config_db = su.open_tiny_store(str(tmp_path / 'config_db.json'),
+                                       indexes=cu.STORE_INDEXES['config'])
+    else:
+        config_db = su.SQLiteStore(str(tmp_path / 'authnyc.db'), 'config',
+                                   indexes=cu.STORE_INDEXES['config'])
+    monkeypatch.setattr(cu, 'get_config_db', lambda: config_db)
+
+    for redirect_uri in ('one', 'two', 'three'):
+        cu.commit_configuration({'name': 'authnyc',
+                                 'redirect_uri': redirect_uri})
+
+    assert cu.find_configuration()['version'] == 3
+    assert cu.get_configuration()['redirect_uri'] == 'three'
+    assert cu.get_config_seq() == 3
+    assert config_db.find('version', 1) is None
+    assert config_db.find('version', 2)['redirect_uri'] == 'two'
+
+
+@pytest.mark.parametrize('backend', ['tinydb', 'sqlite'])
+def test_commit_configuration_across_processes(tmp_path, monkeypatch,
+                                               backend):
+    from authnyc import store_utils as su
+
+    config_path = tmp_path / 'authnyc.toml'
+    config_path.write_text("[config]\noidc_provider_configured = true\n")
+    monkeypatch.setattr(cu, 'get_base_configuration_path',
+                        lambda: str(config_path))
+
+    def open_config_db():
+        if backend == 'tinydb':
+            return su.open_tiny_store(str(tmp_path / 'config_db.json'),
+                                      indexes=cu.STORE_INDEXES['config'])
+        return su.SQLiteStore(str(tmp_path / 'authnyc.db'), 'config',
+                              indexes=cu.STORE_INDEXES['config'])
+
+    # Each worker process has its own store and cached configuration
+    stores = {'a': open_config_db()}
+    configurations = {}
+
+    def switch_to(worker):
+        configurations[current[0]] = cu._configuration
+        current[0] = worker
+        monkeypatch.setattr(cu, '_configuration',
+                            configurations.get(worker, (None, None)))
+
+    current = ['a']
+    monkeypatch.setattr(cu, 'get_config_db', lambda: stores[current[0]])
+    cu.commit_configuration({'name': 'authnyc', 'redirect_uri': 'one'})
+
+    stores['b'] = open_config_db()
+    switch_to('b')
+    assert cu.get_configuration()['redirect_uri'] == 'one'
+
+    switch_to('a')
+    cu.commit_configuration({'name': 'authnyc', 'redirect_uri': 'two'})
+
+    switch_to('b')
+    assert cu.get_configuration()['redirect_uri'] == 'two'
+    assert cu.commit_configuration({'name': 'authnyc',
+                                    'redirect_uri': 'three'}) == 3
+
+    switch_to('a')
+    assert cu.get_configuration()['redirect_uri'] == 'three'
+    assert cu.find_configuration()['version'] == 3
+    assert stores['a'].find('version', 2)['redirect_uri'] == 'two'
+
+
+def test_log_rotation_by_size_and_age(tmp_path):
+    now = [1000.0]
+    should_rotate = cu.get_log_rotation(max_bytes=10, interval=60,
+                                        clock=lambda: now[0])
+
+    with open(tmp_path / 'authnyc.log', 'w+') as f:
+        assert not should_rotate('12345', f)
+        f.write('12345')
+        assert should_rotate('123456', f)
+
+        now[0] += 30
+        assert not should_rotate('1', f)
+        now[0] += 60
+        assert should_rotate('1', f)
+
+
+def test_ensure_clean_start_empties_sqlite_stores(tmp_path, monkeypatch):
+    from authnyc import store_utils as su
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(cu.st, 'session_state', {})
+    monkeypatch.setattr(cu, 'get_base_configuration', lambda: {
+        'storage': {'backend': 'sqlite', 'sqlite_file': 'authnyc.db'}})
+    user_db = su.SQLiteStore(str(tmp_path / 'authnyc.db'), 'user',
+                             indexes=cu.STORE_INDEXES['user'])
+    user_db.insert({'email': 'a@example.com', 'sub': 'auth0|a'})
+
+    cu.ensure_clean_start()
+
+    assert user_db.find('email', 'a@example.com') is None
+    assert list(user_db.iter_all()) == []
@@ -0,0 +1,100 @@
+# test_discovery_utils.py 
+# Description: A Streamlit authentication demonstration application
+# Copyright 2024 Michael Konrad 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# Date: 2026-10-18
+
+import pytest
+import requests
+
+from authnyc import discovery_utils as disc
+
+URL = 'https://tenant.example.com/.well-known/openid-configuration'
+
+
+class FakeResponse:
+    def __init__(self, status_code, document=None, headers=None):
+        self.status_code = status_code
+        self.document = document
+        self.headers = headers or {}
+
+    def json(self):
+        return self.document
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(self.status_code)
+
+
+@pytest.fixture
+def responses(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(disc, '_discovery_cache', {})
+    queued = []
+    requests_sent = []
+
+    def get(url, headers=None):
+        requests_sent.append(headers or {})
+        response = queued.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr(disc.http, 'get', get)
+    return queued, requests_sent
+
+
+def test_fresh_document_is_served_from_memory(responses):
+    queued, requests_sent = responses
+    queued.append(FakeResponse(200, {'issuer': 'a'},
+                               {'Cache-Control': 'public, max-age=600'}))
+
+    assert disc.get_discovery_document(URL) == {'issuer': 'a'}
+    assert disc.get_discovery_document(URL) == {'issuer': 'a'}
+    assert len(requests_sent) == 1
+
+
+@pytest.mark.parametrize('cache_control', ['no-cache', 'max-age=0'])
+def test_uncacheable_document_is_fresh_for_minimum_ttl(responses,
+                                                       cache_control):
+    queued, requests_sent = responses
+    queued.append(FakeResponse(200, {'issuer': 'a'},
+                               {'Cache-Control': cache_control}))
+
+    assert disc.get_discovery_document(URL) == {'issuer': 'a'}
+    assert disc.get_discovery_document(URL) == {'issuer': 'a'}
+    assert len(requests_sent) == 1
+
+
+def test_revalidation_uses_etag_and_survives_errors(responses):
+    queued, requests_sent = responses
+    queued.append(FakeResponse(200, {'issuer': 'a'}, {'ETag': '"v1"'}))
+    disc.fetch_discovery_document(URL)
+
+    queued.append(FakeResponse(304))
+    assert disc.fetch_discovery_document(URL) == {'issuer': 'a'}
+    assert requests_sent[-1] == {'If-None-Match': '"v1"'}
+
+    queued.append(requests.ConnectionError('down'))
+    assert disc.fetch_discovery_document(URL) == {'issuer': 'a'}
+
+
+def test_last_good_copy_is_loaded_from_disk(responses, monkeypatch):
+    queued, requests_sent = responses
+    queued.append(FakeResponse(200, {'issuer': 'a'}, {'ETag': '"v1"'}))
+    disc.fetch_discovery_document(URL)
+
+    monkeypatch.setattr(disc, '_discovery_cache', {})
+    monkeypatch.setattr(disc, 'revalidate_in_background', lambda url: None)
+    assert disc.get_discovery_document(URL) == {'issuer': 'a'}
+    assert len(requests_sent) == 1
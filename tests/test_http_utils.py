@@ -0,0 +1,82 @@
+# test_http_utils.py
+# Description: A Streamlit authentication demonstration application
+# Copyright 2024 Michael Konrad
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# Date: 2026-10-18
+
+import json
+import pytest
+import requests
+
+from authnyc import http_utils as hu
+from requests.adapters import BaseAdapter
+
+
+class FakeAdapter(BaseAdapter):
+    """
+    A transport answering every request with the next queued response.
+    """
+
+    created = []
+
+    def __init__(self, **kwargs):
+        super().__init__()
+        self.sent = []
+        self.responses = []
+        FakeAdapter.created.append(self)
+
+    def send(self, request, timeout=None, **kwargs):
+        self.sent.append((request, timeout))
+        status_code, content = self.responses.pop(0) if self.responses \
+            else (200, {})
+        response = requests.Response()
+        response.status_code = status_code
+        response._content = json.dumps(content).encode()
+        response.headers['Content-Type'] = 'application/json'
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def transport(monkeypatch):
+    monkeypatch.setattr(FakeAdapter, 'created', [])
+    monkeypatch.setattr(hu, 'HTTPAdapter', FakeAdapter)
+    monkeypatch.setattr(hu, '_session', None)
+    monkeypatch.setattr(hu, '_timeout', None)
+    monkeypatch.setattr(hu, 'get_http_config', lambda: dict(
+        hu.HTTP_DEFAULTS, connect_timeout=1.5, read_timeout=4.0))
+    return FakeAdapter.created
+
+
+def test_configured_timeouts_apply(transport):
+    hu.get('https://tenant.example.com/a')
+    hu.get('https://tenant.example.com/b', timeout=30)
+
+    (adapter,) = transport
+    assert [timeout for _, timeout in adapter.sent] == [(1.5, 4.0), 30]
+
+
+def test_session_is_reused(transport):
+    session = hu.get_http_session()
+    hu.post('https://tenant.example.com/oauth/token', json={'a': 1})
+    hu.patch('https://tenant.example.com/api/v2/users/1', json={'b': 2})
+
+    assert hu.get_http_session() is session
+    # One adapter mounted for http and https, created once
+    assert len(transport) == 1
+    assert [request.method for request, _ in transport[0].sent] == \
+        ['POST', 'PATCH']
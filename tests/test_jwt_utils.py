@@ -0,0 +1,111 @@
+# test_jwt_utils.py 
+# Description: A Streamlit authentication demonstration application
+# Copyright 2024 Michael Konrad 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# Date: 2026-10-18
+
+import json
+import jwt
+import pytest
+import time
+
+from authnyc import jwt_utils as ju
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+ISSUER = 'https://tenant.example.com/'
+JWKS_URI = 'https://tenant.example.com/.well-known/jwks.json'
+OIDC_CONFIG = {
+    'provider': {'issuer': ISSUER, 'jwks_uri': JWKS_URI},
+    'client': {'client_id': 'client-1'},
+}
+
+
+def make_key(kid):
+    private_key = rsa.generate_private_key(public_exponent=65537,
+                                           key_size=2048)
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(
+        private_key.public_key()))
+    jwk.update({'kid': kid, 'alg': 'RS256', 'use': 'sig'})
+    return private_key, jwk
+
+
+def make_token(private_key, kid, **claims):
+    now = int(time.time())
+    payload = {'iss': ISSUER, 'aud': 'client-1', 'sub': 'auth0|a',
+               'email': 'a@example.com', 'iat': now, 'exp': now + 300}
+    payload.update(claims)
+    # A claim given as None is left out
+    payload = {k: v for k, v in payload.items() if v is not None}
+    return jwt.encode(payload, private_key, algorithm='RS256',
+                      headers={'kid': kid})
+
+
+@pytest.fixture
+def jwks(monkeypatch):
+    published = {}
+    fetches = []
+
+    def fetch_jwks(jwks_uri):
+        fetches.append(jwks_uri)
+        jwk_set = jwt.PyJWKSet.from_dict({'keys': list(published.values())})
+        return {jwk.key_id: jwk for jwk in jwk_set.keys}
+
+    monkeypatch.setattr(ju, 'fetch_jwks', fetch_jwks)
+    monkeypatch.setattr(ju, '_jwks_cache', {})
+    return published, fetches
+
+
+def test_verify_id_token_uses_cached_jwks(jwks):
+    published, fetches = jwks
+    private_key, published['k1'] = make_key('k1')
+
+    for _ in range(3):
+        claims = ju.verify_id_token(make_token(private_key, 'k1'),
+                                    OIDC_CONFIG)
+        assert claims['email'] == 'a@example.com'
+    assert len(fetches) == 1
+
+
+def test_verify_id_token_refetches_on_rotated_key(jwks, monkeypatch):
+    published, fetches = jwks
+    old_key, published['k1'] = make_key('k1')
+    ju.verify_id_token(make_token(old_key, 'k1'), OIDC_CONFIG)
+
+    new_key, published['k2'] = make_key('k2')
+    monkeypatch.setattr(ju, 'JWKS_MIN_REFETCH_INTERVAL', 0)
+    assert ju.verify_id_token(make_token(new_key, 'k2'), OIDC_CONFIG)
+    assert len(fetches) == 2
+
+
+def test_verify_id_token_rejects_bad_tokens(jwks):
+    published, fetches = jwks
+    private_key, published['k1'] = make_key('k1')
+    other_key, _ = make_key('k1')
+
+    with pytest.raises(jwt.InvalidSignatureError):
+        ju.verify_id_token(make_token(other_key, 'k1'), OIDC_CONFIG)
+    with pytest.raises(jwt.InvalidAudienceError):
+        ju.verify_id_token(make_token(private_key, 'k1', aud='other'),
+                           OIDC_CONFIG)
+    with pytest.raises(jwt.InvalidAlgorithmError):
+        ju.verify_id_token(jwt.encode({'sub': 'a'}, 'secret'), OIDC_CONFIG)
+
+
+@pytest.mark.parametrize('claim', ju.ID_TOKEN_REQUIRED_CLAIMS)
+def test_verify_id_token_requires_claims(jwks, claim):
+    published, fetches = jwks
+    private_key, published['k1'] = make_key('k1')
+    token = make_token(private_key, 'k1', **{claim: None})
+
+    with pytest.raises(jwt.MissingRequiredClaimError):
+        ju.verify_id_token(token, OIDC_CONFIG)
@@ -0,0 +1,83 @@
+# test_metrics_utils.py 
+# Description: A Streamlit authentication demonstration application
+# Copyright 2024 Michael Konrad 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# Date: 2026-10-18
+
+import pytest
+import threading
+import urllib.error
+import urllib.request
+
+from authnyc import metrics_utils as mu
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(mu, '_metrics', {})
+
+
+def test_histogram_renders_cumulative_buckets(registry):
+    latency = mu.histogram('test_seconds', "Test latency.", labels=('page',),
+                           buckets=(0.1, 1.0))
+    latency.observe(0.05, page='home')
+    latency.observe(0.5, page='home')
+
+    text = mu.render_metrics()
+
+    assert '# TYPE test_seconds histogram' in text
+    assert 'test_seconds_bucket{page="home",le="0.1"} 1' in text
+    assert 'test_seconds_bucket{page="home",le="1.0"} 2' in text
+    assert 'test_seconds_bucket{page="home",le="+Inf"} 2' in text
+    assert 'test_seconds_count{page="home"} 2' in text
+
+
+def test_timed_records_duration_and_errors(registry, monkeypatch):
+    duration = mu.histogram('duration', "Duration.", labels=('function',))
+    errors = mu.counter('errors', "Errors.", labels=('function',))
+    monkeypatch.setattr(mu, 'FUNCTION_DURATION', duration)
+    monkeypatch.setattr(mu, 'FUNCTION_ERRORS', errors)
+
+    @mu.timed('fails')
+    def fails():
+        raise ValueError('bad')
+
+    with pytest.raises(ValueError):
+        fails()
+    mu.timed('works')(lambda: None)()
+
+    text = mu.render_metrics()
+    assert 'duration_count{function="fails"} 1' in text
+    assert 'duration_count{function="works"} 1' in text
+    assert 'errors{function="fails"} 1' in text
+    assert 'function="works"' not in text.split('# HELP errors')[1]
+
+
+def test_ready_endpoint_follows_readiness_check(monkeypatch):
+    ready = [False]
+    monkeypatch.setattr(mu, '_readiness_check', None)
+    mu.set_readiness_check(lambda: ready[0])
+    server = mu.ThreadingHTTPServer(('127.0.0.1', 0), mu.MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_address[1]}/ready'
+    try:
+        with pytest.raises(urllib.error.HTTPError) as e:
+            urllib.request.urlopen(url)
+        assert e.value.code == 503
+
+        ready[0] = True
+        with urllib.request.urlopen(url) as response:
+            assert response.status == 200
+    finally:
+        server.shutdown()
+        server.server_close()
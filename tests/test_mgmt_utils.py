@@ -0,0 +1,104 @@
+# test_mgmt_utils.py
+# Description: A Streamlit authentication demonstration application
+# Copyright 2024 Michael Konrad
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# Date: 2026-10-18
+
+import json
+import pytest
+
+from authnyc import mgmt_utils as mu
+
+
+class FakeResponse:
+
+    def __init__(self, status_code, content=None, headers=None):
+        self.status_code = status_code
+        self.content = json.dumps(content).encode() if content else b''
+        self.headers = headers or {}
+        self.reason = 'Reason'
+
+    def json(self):
+        return json.loads(self.content)
+
+
+@pytest.fixture
+def transport(monkeypatch):
+    responses = []
+    sent = []
+
+    def request(method, url, **kwargs):
+        sent.append((method, url, kwargs))
+        return responses.pop(0)
+
+    monkeypatch.setattr(mu.http, 'request', request)
+    monkeypatch.setattr(mu, '_rate_limiters', {})
+    monkeypatch.setattr(mu, 'get_mgmt_api_config', lambda: {
+        'rate_limit': 100.0, 'burst': 100, 'rate_limit_retries': 3})
+    return responses, sent
+
+
+def test_token_fetch_goes_through_rate_limiter(transport):
+    responses, sent = transport
+    responses.extend([
+        FakeResponse(429, headers={'Retry-After': '0'}),
+        FakeResponse(200, {'access_token': 't', 'expires_in': 60},
+                     {'X-RateLimit-Limit': '50',
+                      'X-RateLimit-Remaining': '49'}),
+    ])
+
+    token = mu.get_client_credentials_token('tenant.example.com', 'id',
+                                            'secret', 'audience')
+
+    assert token['access_token'] == 't'
+    assert [method for method, _, _ in sent] == ['POST', 'POST']
+    assert sent[0][1] == 'https://tenant.example.com/oauth/token'
+    rate_limiter = mu.get_rate_limiter('tenant.example.com')
+    assert rate_limiter.burst == 50
+
+
+@pytest.mark.parametrize('status_code, content, error_code, message', [
+    (400, {'errorCode': 'invalid_body', 'message': 'Bad name'},
+     'invalid_body', 'Bad name'),
+    (401, {'error': 'access_denied', 'error_description': 'Unauthorized'},
+     'access_denied', 'Unauthorized'),
+    (500, ['unexpected'], '', 'Reason'),
+    (503, None, '', 'Reason'),
+])
+def test_parse_response_raises_for_errors(status_code, content, error_code,
+                                          message):
+    with pytest.raises(mu.Auth0Error) as e:
+        mu.parse_response(FakeResponse(status_code, content))
+
+    assert e.value.status_code == status_code
+    assert e.value.error_code == error_code
+    assert e.value.message == message
+
+
+def test_parse_response_returns_content():
+    assert mu.parse_response(FakeResponse(200, {'id': 'a'})) == {'id': 'a'}
+    assert mu.parse_response(FakeResponse(204)) == {}
+
+
+def test_update_user(transport):
+    responses, sent = transport
+    responses.append(FakeResponse(200, {'user_id': 'auth0|a'}))
+    client = mu.ManagementClient('tenant.example.com', 'token')
+
+    assert client.update_user('auth0|a', {'name': 'A'}) == \
+        {'user_id': 'auth0|a'}
+    method, url, kwargs = sent[0]
+    assert method == 'PATCH'
+    assert url == 'https://tenant.example.com/api/v2/users/auth0%7Ca'
+    assert kwargs['json'] == {'name': 'A'}
+    assert kwargs['headers'] == {'Authorization': 'Bearer token'}
@@ -0,0 +1,78 @@
+# test_myprofile_form.py
+# Description: A Streamlit authentication demonstration application
+# Copyright 2024 Michael Konrad 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# Date: 2026-10-18
+
+import pytest
+
+from authnyc import myprofile_form as mf
+from authnyc import user_utils as uu
+
+
+class SessionState(dict):
+    """
+    A dict read by key or, like st.session_state, by attribute.
+    """
+
+    def __getattr__(self, key):
+        return self[key]
+
+
+@pytest.fixture
+def profile_edit(monkeypatch):
+    session_state = SessionState({
+        'user_record': uu.UserClaims(sub='auth0|a', name='Old'),
+        'FormSubmitter:user_profile-Submit': True,
+        'profile_form_name': 'New',
+        'profile_form_nickname': '',
+        'profile_form_given_name': '',
+        'profile_form_family_name': '',
+    })
+    monkeypatch.setattr(mf.st, 'session_state', session_state)
+    monkeypatch.setattr(mf, 'enqueue_profile_update', lambda record: True)
+    statuses = {}
+    monkeypatch.setattr(mf, 'get_profile_update_status', statuses.get)
+
+    mf.profile_form_button_clicked()
+    assert session_state['user_record'].name == 'New'
+    return session_state, statuses
+
+
+@pytest.mark.parametrize('state, name', [('applying', 'New'),
+                                         ('applied', 'New'),
+                                         ('failed', 'Old')])
+def test_profile_edit_settled_by_status(profile_edit, state, name):
+    session_state, statuses = profile_edit
+    statuses['auth0|a'] = {'state': state, 'error': None}
+
+    mf.settle_profile_update()
+
+    assert session_state['user_record'].name == name
+    assert ('profile_update_rollback' in session_state) == \
+        (state == 'applying')
+
+
+def test_profile_update_outcome_shown_once(profile_edit, monkeypatch):
+    session_state, statuses = profile_edit
+    shown = []
+    monkeypatch.setattr(mf.st, 'caption', shown.append)
+    statuses['auth0|a'] = {'state': 'queued', 'updated_at': 1, 'error': None}
+
+    mf.present_profile_update_status()
+    mf.present_profile_update_status()
+    statuses['auth0|a'] = {'state': 'applied', 'updated_at': 2, 'error': None}
+    mf.present_profile_update_status()
+    mf.present_profile_update_status()
+
+    assert shown == ["Profile update queued..."] * 2 + ["Profile updated."]
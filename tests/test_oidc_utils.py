@@ -0,0 +1,108 @@
+# test_oidc_utils.py
+# Description: A Streamlit authentication demonstration application
+# Copyright 2024 Michael Konrad
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# Date: 2026-10-18
+
+import pytest
+import threading
+
+from authnyc import oidc_utils as oidc
+from authnyc import store_utils as su
+
+
+@pytest.fixture
+def oidc_db(tmp_path, monkeypatch):
+    oidc_db = su.SQLiteStore(str(tmp_path / 'authnyc.db'), 'oidc',
+                             indexes=('name',))
+    oidc_db.insert({'name': 'auth0', 'config': {'scopes': ['openid']}})
+    loads = []
+    all_records = oidc_db.all
+
+    def all():
+        loads.append(threading.get_ident())
+        return all_records()
+
+    monkeypatch.setattr(oidc_db, 'all', all)
+    monkeypatch.setattr(oidc, 'get_oidc_db', lambda: oidc_db)
+    monkeypatch.setattr(oidc, '_provider_registry', (None, None))
+    monkeypatch.setattr(oidc, '_provider_listeners', [])
+    monkeypatch.setattr(oidc, 'get_config_seq', lambda: 0)
+    return oidc_db, loads
+
+
+def test_provider_registry_loaded_once(oidc_db):
+    _, loads = oidc_db
+    threads = [threading.Thread(target=oidc.lookup_provider, args=('auth0',))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert oidc.lookup_provider('auth0')['config']['scopes'] == ('openid',)
+    assert len(loads) == 1
+
+
+def test_register_provider_writes_through(oidc_db):
+    store, loads = oidc_db
+    changes = []
+    oidc.on_provider_change(changes.append)
+    registry = oidc.get_provider_registry()
+
+    oidc.register_provider({'name': 'auth0', 'config': {'scopes': []}})
+
+    assert oidc.lookup_provider('auth0')['config']['scopes'] == ()
+    assert store.find('name', 'auth0')['config']['scopes'] == []
+    assert registry['auth0']['config']['scopes'] == ('openid',)
+    assert changes == ['auth0']
+    assert len(loads) == 1
+
+
+def test_provider_records_are_read_only(oidc_db):
+    provider_record = oidc.lookup_provider('auth0')
+
+    with pytest.raises(TypeError):
+        provider_record['name'] = 'other'
+    with pytest.raises(TypeError):
+        provider_record['config']['scopes'] = ['email']
+    with pytest.raises(AttributeError):
+        provider_record['config']['scopes'].append('email')
+
+
+def test_provider_registry_follows_other_workers(tmp_path, monkeypatch):
+    path = str(tmp_path / 'oidc_db.json')
+    worker_db = su.open_tiny_store(path, indexes=('name',))
+    other_worker_db = su.open_tiny_store(path, indexes=('name',))
+    seq = [0]
+    monkeypatch.setattr(oidc, 'get_oidc_db', lambda: worker_db)
+    monkeypatch.setattr(oidc, 'get_config_seq', lambda: seq[0])
+    monkeypatch.setattr(oidc, '_provider_registry', (None, None))
+    monkeypatch.setattr(oidc, '_provider_listeners', [])
+    changes = []
+    oidc.on_provider_change(changes.append)
+    assert oidc.get_provider_registry() == {}
+
+    # Saved by another worker before the configuration is committed
+    other_worker_db.insert({'name': 'auth0', 'config': {'scopes': []}})
+    assert oidc.lookup_provider('auth0')['config']['scopes'] == ()
+
+    other_worker_db.insert({'name': 'auth0', 'config': {'scopes': ['email']}})
+    seq[0] += 1
+    assert oidc.lookup_provider('auth0')['config']['scopes'] == ('email',)
+    assert changes == ['auth0']
+
+
+def test_unknown_provider_config_raises(oidc_db):
+    with pytest.raises(ValueError, match='Unknown OIDC provider missing'):
+        oidc.get_provider_config('missing')
@@ -0,0 +1,77 @@
+# test_prefetch_utils.py 
+# Description: A Streamlit authentication demonstration application
+# Copyright 2024 Michael Konrad 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# Date: 2026-10-18
+
+import asyncio
+import httpx
+import json
+import jwt
+import pytest
+
+from authnyc import prefetch_utils as pu
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+# The module caches prefetch_utils fills, as imported by the application
+disc = pu.discovery
+ju = pu.ju
+
+JWKS_URI = 'https://good.example.com/.well-known/jwks.json'
+TARGETS = {
+    'good': 'https://good.example.com/.well-known/openid-configuration',
+    'down': 'https://down.example.com/.well-known/openid-configuration',
+}
+
+
+def make_jwk(kid):
+    private_key = rsa.generate_private_key(public_exponent=65537,
+                                           key_size=2048)
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(
+        private_key.public_key()))
+    jwk.update({'kid': kid, 'alg': 'RS256', 'use': 'sig'})
+    return jwk
+
+
+@pytest.fixture
+def caches(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(disc, '_discovery_cache', {})
+    monkeypatch.setattr(ju, '_jwks_cache', {})
+
+
+def test_prefetch_fills_caches_and_reports_failures(caches):
+    jwk = make_jwk('k1')
+
+    def handler(request):
+        if request.url.host == 'down.example.com':
+            raise httpx.ConnectError('down', request=request)
+        if request.url.path.endswith('jwks.json'):
+            return httpx.Response(200, json={'keys': [jwk]})
+        return httpx.Response(200, json={'issuer': 'https://good.example.com/',
+                                         'jwks_uri': JWKS_URI})
+
+    async def prefetch():
+        transport = httpx.MockTransport(handler)
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await asyncio.gather(
+                *(pu.prefetch_provider(client, key, url)
+                  for key, url in TARGETS.items()))
+
+    good, down = asyncio.run(prefetch())
+
+    assert good['error'] is None
+    assert 'ConnectError' in down['error']
+    assert disc._discovery_cache[TARGETS['good']]['document']['jwks_uri'] == \
+        JWKS_URI
+    assert 'k1' in ju._jwks_cache[JWKS_URI]['keys']
@@ -0,0 +1,117 @@
+# test_profile_update_utils.py 
+# Description: A Streamlit authentication demonstration application
+# Copyright 2024 Michael Konrad 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# Date: 2026-10-18
+
+import pytest
+import queue
+import threading
+import time
+
+from auth0.exceptions import Auth0Error
+from authnyc import profile_update_utils as pu
+
+
+@pytest.fixture
+def updates(monkeypatch):
+    monkeypatch.setattr(pu, '_update_queue', queue.Queue(maxsize=10))
+    monkeypatch.setattr(pu, '_pending', {})
+    monkeypatch.setattr(pu, '_statuses', pu.OrderedDict())
+    monkeypatch.setattr(pu, '_workers_started', False)
+    monkeypatch.setattr(pu, 'PROFILE_UPDATE_WORKERS', 1)
+    monkeypatch.setattr(pu, 'PROFILE_UPDATE_BACKOFF', 0)
+    monkeypatch.setattr(pu, 'get_auth0_api_authenticator', lambda: None)
+    applied = []
+    failures = []
+    release = threading.Event()
+
+    def update_auth0_user(updated_user_record, auth0_mgmt_api):
+        release.wait(5)
+        if failures:
+            raise failures.pop(0)
+        applied.append(dict(updated_user_record))
+
+    monkeypatch.setattr(pu, 'update_auth0_user', update_auth0_user)
+    return applied, failures, release
+
+
+def wait_for_state(sub, state):
+    ended = time.monotonic() + 5
+    while time.monotonic() < ended:
+        status = pu.get_profile_update_status(sub)
+        if status is not None and status['state'] == state:
+            return status
+        time.sleep(0.01)
+    raise AssertionError(f"{sub} never reached {state}")
+
+
+def test_repeated_edits_are_coalesced(updates):
+    applied, failures, release = updates
+
+    assert pu.enqueue_profile_update({'sub': 'a', 'name': 'x'})
+    wait_for_state('a', 'applying')
+    pu.enqueue_profile_update({'sub': 'a', 'nickname': 'y'})
+    pu.enqueue_profile_update({'sub': 'a', 'name': 'z'})
+    assert pu.get_profile_update_status('a')['state'] == 'queued'
+    release.set()
+
+    wait_for_state('a', 'applied')
+    assert applied == [{'sub': 'a', 'name': 'x'},
+                       {'sub': 'a', 'nickname': 'y', 'name': 'z'}]
+
+
+def test_retries_transient_errors_only(updates):
+    applied, failures, release = updates
+    release.set()
+
+    failures.extend([Auth0Error(503, '', 'unavailable'),
+                     Auth0Error(502, '', 'bad gateway')])
+    pu.enqueue_profile_update({'sub': 'a', 'name': 'x'})
+    wait_for_state('a', 'applied')
+    assert applied == [{'sub': 'a', 'name': 'x'}]
+
+    failures.append(Auth0Error(400, '', 'bad request'))
+    pu.enqueue_profile_update({'sub': 'b', 'name': 'x'})
+    assert 'bad request' in wait_for_state('b', 'failed')['error']
+
+
+class RateLimitedResponse:
+    status_code = 429
+    headers = {'Retry-After': '0'}
+    content = b'{}'
+    reason = 'Too Many Requests'
+
+    def json(self):
+        return {}
+
+
+def test_rate_limited_update_retried_by_client_only(monkeypatch):
+    from authnyc import mgmt_utils as mu
+
+    sent = []
+
+    def request(method, url, **kwargs):
+        sent.append(method)
+        return RateLimitedResponse()
+
+    monkeypatch.setattr(mu.http, 'request', request)
+    monkeypatch.setattr(mu, '_rate_limiters', {})
+    monkeypatch.setattr(mu, 'get_mgmt_api_config', lambda: {
+        'rate_limit': 100.0, 'burst': 100, 'rate_limit_retries': 3})
+    client = mu.ManagementClient('tenant.example.com', 'token')
+    monkeypatch.setattr(pu, 'get_auth0_api_authenticator', lambda: client)
+    monkeypatch.setattr(pu, 'PROFILE_UPDATE_BACKOFF', 0)
+
+    assert pu.apply_profile_update('a', {'name': 'x'}) is not None
+    assert sent == ['PATCH'] * 4
@@ -0,0 +1,69 @@
+# test_profile_utils.py 
+# Description: A Streamlit authentication demonstration application
+# Copyright 2024 Michael Konrad 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# Date: 2026-10-18
+
+import pytest
+import time
+
+from authnyc import profile_utils as pu
+
+
+def busy_wait(seconds):
+    ended = time.perf_counter() + seconds
+    while time.perf_counter() < ended:
+        pass
+
+
+def test_profiled_writes_collapsed_stacks(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(pu, 'get_profiling_config', lambda: dict(
+        pu.PROFILING_DEFAULTS, enabled=True, sample_rate=1.0, interval=0.001))
+
+    with pu.profiled('home'):
+        busy_wait(0.1)
+
+    profiles = list((tmp_path / 'profiles').glob('home-*.folded'))
+    assert len(profiles) == 1
+    lines = profiles[0].read_text().splitlines()
+    assert any('test_profile_utils.py:busy_wait' in line for line in lines)
+    stack, count = lines[0].rsplit(' ', 1)
+    assert int(count) > 0
+
+
+def test_profiling_is_off_by_default(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(pu, 'get_profiling_config',
+                        lambda: dict(pu.PROFILING_DEFAULTS))
+
+    with pu.profiled('home'):
+        pass
+
+    assert not (tmp_path / 'profiles').exists()
+
+
+@pytest.mark.parametrize('profile_env, enabled, sample_rate', [
+    ('1', True, 0.01),
+    ('true', True, 0.01),
+    ('0.05', True, 0.05),
+    ('0', False, 0.01),
+])
+def test_profile_env(monkeypatch, profile_env, enabled, sample_rate):
+    monkeypatch.setattr(pu, 'get_base_configuration', lambda: {})
+    monkeypatch.setenv(pu.PROFILE_ENV, profile_env)
+
+    profiling_config = pu.get_profiling_config()
+
+    assert profiling_config['enabled'] == enabled
+    assert profiling_config['sample_rate'] == sample_rate
@@ -0,0 +1,79 @@
+# test_rate_limit_utils.py 
+# Description: A Streamlit authentication demonstration application
+# Copyright 2024 Michael Konrad 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# Date: 2026-10-18
+
+import threading
+import time
+
+from authnyc import rate_limit_utils as rl
+
+
+def test_burst_then_rate():
+    limiter = rl.RateLimiter('test', rate=50.0, burst=2)
+
+    assert limiter.acquire() < 0.01
+    assert limiter.acquire() < 0.01
+    assert limiter.acquire() >= 0.01
+
+
+def test_callers_are_served_in_order():
+    limiter = rl.RateLimiter('test', rate=100.0, burst=1)
+    limiter.acquire()
+    served = []
+
+    def call(i):
+        limiter.acquire()
+        served.append(i)
+
+    threads = []
+    for i in range(5):
+        thread = threading.Thread(target=call, args=(i,))
+        thread.start()
+        threads.append(thread)
+        # Let each caller queue before the next one
+        time.sleep(0.002)
+    for thread in threads:
+        thread.join()
+
+    assert served == [0, 1, 2, 3, 4]
+
+
+def test_headers_adapt_rate_and_429_holds_callers():
+    limiter = rl.RateLimiter('test', rate=100.0, burst=10)
+
+    limiter.update(200, {'X-RateLimit-Limit': '5',
+                         'X-RateLimit-Remaining': '2',
+                         'X-RateLimit-Reset': str(time.time() + 10)})
+    assert limiter.burst == 5
+    assert limiter.tokens <= 2
+    assert limiter.rate < 1
+
+    limiter = rl.RateLimiter('test', rate=100.0, burst=10)
+    limiter.update(429, {'Retry-After': '0.1'})
+    assert limiter.acquire() >= 0.09
+
+
+def test_full_rate_restored_when_limit_resets():
+    limiter = rl.RateLimiter('test', rate=100.0, burst=10)
+
+    limiter.update(200, {'X-RateLimit-Limit': '10',
+                         'X-RateLimit-Remaining': '0',
+                         'X-RateLimit-Reset': str(time.time() + 0.2)})
+    assert limiter.rate == rl.MIN_RATE
+
+    # Without the reset the next token would take 10s at the minimum rate
+    assert limiter.acquire() < 1
+    assert limiter.rate == 100.0
+    assert limiter.acquire() < 0.01
@@ -0,0 +1,142 @@
+# test_session_utils.py 
+# Description: A Streamlit authentication demonstration application
+# Copyright 2024 Michael Konrad 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# Date: 2026-10-18
+
+import dataclasses
+import pytest
+import time
+
+from authnyc import session_utils as su
+
+
+@pytest.fixture
+def clock():
+    return [time.time()]
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def session_store(request, tmp_path, clock):
+    if request.param == 'sqlite':
+        store = su.SQLiteSessionStore(str(tmp_path / 'sessions.db'), ttl=60,
+                                      clock=lambda: clock[0])
+    else:
+        store = su.MemorySessionStore(ttl=60, clock=lambda: clock[0])
+    yield store
+    store.close()
+
+
+def test_sessions_expire_and_are_swept(session_store, clock):
+    session_store.put('s1', {'token': {'id_token': 'i'}})
+    session_store.put('s2', {'token': {'id_token': 'j'}})
+    session_store.delete('s2')
+
+    assert session_store.get('s1') == {'token': {'id_token': 'i'}}
+    assert session_store.get('s2') is None
+
+    clock[0] += 61
+    assert session_store.get('s1') is None
+    assert session_store.sweep() == 1
+
+
+def test_sqlite_sessions_are_shared(tmp_path):
+    path = str(tmp_path / 'sessions.db')
+    replica_a = su.SQLiteSessionStore(path, ttl=60)
+    replica_b = su.SQLiteSessionStore(path, ttl=60)
+
+    replica_a.put('s1', {'token': {'id_token': 'i'}})
+
+    assert replica_b.get('s1') == {'token': {'id_token': 'i'}}
+    replica_a.close()
+    replica_b.close()
+
+
+def test_cookie_signature_is_checked(monkeypatch):
+    monkeypatch.setenv(su.SESSION_SECRET_ENV, 'secret')
+    monkeypatch.setattr(su, '_serializer', None)
+    monkeypatch.setattr(su, 'get_session_config',
+                        lambda: dict(su.SESSION_DEFAULTS))
+    cookies = {}
+    monkeypatch.setattr(su.st, 'context',
+                        type('Context', (), {'cookies': cookies}))
+
+    cookies['authnyc_session'] = su.get_serializer().dumps('s1')
+    assert su.get_cookie_session_id() == 's1'
+
+    cookies['authnyc_session'] = cookies['authnyc_session'][:-2] + 'xx'
+    assert su.get_cookie_session_id() is None
+
+
+@pytest.fixture
+def saved_session(monkeypatch):
+    monkeypatch.setenv(su.SESSION_SECRET_ENV, 'secret')
+    monkeypatch.setattr(su, '_session_secret', None)
+    monkeypatch.setattr(su, '_serializer', None)
+    monkeypatch.setattr(su, '_token_cipher', None)
+    session_store = su.MemorySessionStore(ttl=60)
+    monkeypatch.setattr(su, 'get_session_store', lambda: session_store)
+    session_state = {}
+    monkeypatch.setattr(su.st, 'session_state', session_state)
+    token = {'access_token': 'a' * 40, 'id_token': 'i' * 40,
+             'refresh_token': 'r' * 40, 'expires_at': time.time() + 3600}
+    session_state['auth_context'] = su.create_auth_context(token)
+    su.save_session()
+    return session_store, session_state, token
+
+
+def test_saved_token_is_encrypted(saved_session, monkeypatch):
+    session_store, session_state, token = saved_session
+    data = session_store.get(session_state['auth_session_id'])
+
+    assert isinstance(data['token'], str)
+    assert token['refresh_token'] not in data['token']
+    assert su.decrypt_token(data['token']) == token
+
+    monkeypatch.setenv(su.SESSION_SECRET_ENV, 'other')
+    monkeypatch.setattr(su, '_session_secret', None)
+    monkeypatch.setattr(su, '_token_cipher', None)
+    assert not su.restore_session()
+
+
+def evict(session_state):
+    session_state['auth_context'] = dataclasses.replace(
+        session_state['auth_context'], handle='evicted')
+
+
+def test_evicted_token_is_restored(saved_session):
+    session_store, session_state, token = saved_session
+    evict(session_state)
+
+    assert su.restore_session_token() == token
+    assert su.get_session_token() == token
+
+    session_store.delete(session_state['auth_session_id'])
+    evict(session_state)
+    assert su.restore_session_token() is None
+
+
+def test_sqlite_sessions_require_secret(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv(su.SESSION_SECRET_ENV, raising=False)
+    session_config = dict(su.SESSION_DEFAULTS, backend='sqlite')
+
+    assert isinstance(su.open_session_store(su.SESSION_DEFAULTS),
+                      su.MemorySessionStore)
+    with pytest.raises(ValueError, match=su.SESSION_SECRET_ENV):
+        su.open_session_store(session_config)
+
+    monkeypatch.setenv(su.SESSION_SECRET_ENV, 'secret')
+    session_store = su.open_session_store(session_config)
+    assert isinstance(session_store, su.SQLiteSessionStore)
+    session_store.close()
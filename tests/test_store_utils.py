@@ -0,0 +1,169 @@
+# test_store_utils.py 
+# Description: A Streamlit authentication demonstration application
+# Copyright 2024 Michael Konrad 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# Date: 2026-10-18
+
+import json
+import pytest
+
+from authnyc import store_utils as su
+from tinydb import TinyDB
+from tinydb.storages import MemoryStorage
+
+
+@pytest.fixture
+def user_store():
+    db = TinyDB(storage=MemoryStorage)
+    return su.TinyStore(db, indexes=('email', 'sub'))
+
+
+def test_find_by_indexed_fields(user_store):
+    user_store.insert({'email': 'a@example.com', 'sub': 'auth0|a'})
+    user_store.insert({'email': 'b@example.com', 'sub': 'auth0|b'})
+
+    assert user_store.find('email', 'b@example.com')['sub'] == 'auth0|b'
+    assert user_store.find('sub', 'auth0|a')['email'] == 'a@example.com'
+    assert user_store.find('email', 'c@example.com') is None
+    with pytest.raises(KeyError):
+        user_store.find('name', 'a')
+
+
+def test_indexes_follow_update_and_remove(user_store):
+    user_store.insert({'email': 'a@example.com', 'sub': 'auth0|a'})
+
+    assert user_store.update({'email': 'z@example.com'}, 'sub', 'auth0|a')
+    assert user_store.find('email', 'a@example.com') is None
+    assert user_store.find('email', 'z@example.com')['sub'] == 'auth0|a'
+    assert user_store.db.all()[0]['email'] == 'z@example.com'
+
+    assert user_store.remove('email', 'z@example.com')
+    assert user_store.find('sub', 'auth0|a') is None
+    assert len(user_store) == 0 and len(user_store.db) == 0
+
+
+def test_indexes_rebuilt_on_open():
+    db = TinyDB(storage=MemoryStorage)
+    db.insert({'email': 'a@example.com', 'sub': 'auth0|a'})
+
+    user_store = su.TinyStore(db, indexes=('email', 'sub'))
+    assert user_store.find('sub', 'auth0|a')['email'] == 'a@example.com'
+
+
+def test_write_behind_buffers_until_flush(tmp_path):
+    path = tmp_path / 'user_db.json'
+    user_store = su.open_tiny_store(str(path), indexes=('email',),
+                                    write_behind=True, flush_size=10,
+                                    flush_interval=None)
+    for i in range(3):
+        user_store.insert({'email': f'{i}@example.com'})
+    user_store.update({'name': 'One'}, 'email', '1@example.com')
+
+    assert user_store.find('email', '1@example.com')['name'] == 'One'
+    assert path.read_text() in ('', '{}')
+
+    user_store.flush()
+    assert len(json.loads(path.read_text())['_default']) == 3
+    user_store.close()
+
+
+def test_write_behind_flushes_on_size(tmp_path):
+    path = tmp_path / 'user_db.json'
+    user_store = su.open_tiny_store(str(path), indexes=('email',),
+                                    write_behind=True, flush_size=2,
+                                    flush_interval=None, fsync=False)
+    user_store.insert({'email': 'a@example.com'})
+    user_store.insert({'email': 'b@example.com'})
+
+    assert len(json.loads(path.read_text())['_default']) == 2
+    user_store.close()
+
+
+def test_sqlite_store_indexed_lookups(tmp_path):
+    path = str(tmp_path / 'authnyc.db')
+    user_store = su.SQLiteStore(path, 'user', indexes=('email', 'sub'))
+    user_store.insert({'email': 'a@example.com', 'sub': 'auth0|a'})
+
+    assert user_store.db.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+    assert user_store.find('sub', 'auth0|a')['email'] == 'a@example.com'
+
+    assert user_store.update({'email': 'z@example.com'}, 'sub', 'auth0|a')
+    assert user_store.find('email', 'a@example.com') is None
+
+    # A second process sees the same store
+    other_store = su.SQLiteStore(path, 'user', indexes=('email', 'sub'))
+    assert other_store.find('email', 'z@example.com')['sub'] == 'auth0|a'
+
+    assert other_store.remove('sub', 'auth0|a')
+    assert len(user_store) == 0
+    user_store.close()
+    other_store.close()
+
+
+def test_migrate_tinydb_store(tmp_path):
+    from authnyc import migrate_store as ms
+
+    json_path = str(tmp_path / 'config_db.json')
+    with TinyDB(json_path) as db:
+        db.insert({'name': 'authnyc', 'redirect_uri': 'old'})
+        db.insert({'name': 'authnyc', 'redirect_uri': 'new'})
+    sqlite_path = str(tmp_path / 'authnyc.db')
+
+    assert ms.migrate_store('config', json_path, sqlite_path) == 2
+    assert ms.migrate_store('config', json_path, sqlite_path) == 0
+
+    config_store = su.SQLiteStore(sqlite_path, 'config', indexes=('name',))
+    assert config_store.find('name', 'authnyc')['redirect_uri'] == 'new'
+    config_store.close()
+
+
+@pytest.mark.parametrize('backend', ['tinydb', 'sqlite'])
+def test_upsert_many_and_iter_all(tmp_path, backend):
+    if backend == 'tinydb':
+        user_store = su.open_tiny_store(str(tmp_path / 'user_db.json'),
+                                        indexes=('email', 'sub'))
+    else:
+        user_store = su.SQLiteStore(str(tmp_path / 'authnyc.db'), 'user',
+                                    indexes=('email', 'sub'))
+    user_store.insert({'email': 'a@example.com', 'sub': 'auth0|a'})
+
+    inserted, updated = user_store.upsert_many(
+        [{'email': 'a@example.com', 'name': 'A'},
+         {'email': 'b@example.com', 'sub': 'auth0|b'}], 'email')
+
+    assert (inserted, updated) == (1, 1)
+    assert user_store.find('sub', 'auth0|a')['name'] == 'A'
+    assert user_store.find('sub', 'auth0|b')['email'] == 'b@example.com'
+    assert [r['email'] for r in user_store.iter_all(batch_size=1)] == \
+        ['a@example.com', 'b@example.com']
+    user_store.close()
+
+
+def test_atomic_writes_replace_the_file(tmp_path):
+    path = tmp_path / 'config_db.json'
+    config_store = su.open_tiny_store(str(path), indexes=('name',),
+                                      atomic_writes=True)
+    config_store.insert({'name': 'authnyc', 'version': 1})
+    inode = path.stat().st_ino
+
+    # A write which fails leaves the previous contents whole
+    with pytest.raises(TypeError):
+        config_store.insert({'name': 'current', 'version': object()})
+    assert json.loads(path.read_text())['_default'] == {
+        '1': {'name': 'authnyc', 'version': 1}}
+
+    config_store.insert({'name': 'current', 'version': 2})
+    assert path.stat().st_ino != inode
+    assert list(tmp_path.glob('*.tmp')) == []
+    reopened = su.open_tiny_store(str(path), indexes=('name',))
+    assert reopened.find('name', 'current')['version'] == 2
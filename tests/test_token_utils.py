@@ -0,0 +1,148 @@
+# test_token_utils.py 
+# Description: A Streamlit authentication demonstration application
+# Copyright 2024 Michael Konrad 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# Date: 2026-10-18
+
+import pytest
+import threading
+import time
+
+from authnyc import token_utils as tu
+
+TOKEN = {
+    'access_token': 'a' * 800,
+    'id_token': 'i' * 1200,
+    'refresh_token': 'r' * 100,
+    'expires_at': time.time() + 3600,
+}
+
+
+@pytest.fixture
+def session(monkeypatch):
+    session_state = {}
+    monkeypatch.setattr(tu.st, 'session_state', session_state)
+    monkeypatch.setattr(tu, '_token_cache', tu.OrderedDict())
+    return session_state
+
+
+def test_session_holds_only_a_handle(session):
+    session['auth_context'] = tu.create_auth_context(TOKEN)
+
+    assert session['auth_context'].refreshable
+    assert tu.get_session_token() is TOKEN
+    assert tu.get_session_memory() < len(TOKEN['id_token'])
+
+    tu.discard_session_token()
+    assert tu.get_session_token() is None
+
+
+def test_token_cache_evicts_least_recently_used(session, monkeypatch):
+    monkeypatch.setattr(tu, 'TOKEN_CACHE_SIZE', 2)
+    first = tu.create_auth_context(TOKEN)
+    second = tu.create_auth_context(TOKEN)
+
+    session['auth_context'] = first
+    tu.get_session_token()
+    tu.create_auth_context(TOKEN)
+
+    assert tu.get_session_token() is TOKEN
+    session['auth_context'] = second
+    assert tu.get_session_token() is None
+
+
+class FakeAuthenticator:
+
+    def __init__(self, error=None):
+        self.calls = []
+        self.error = error
+        self.release = threading.Event()
+
+    def refresh_token(self, token, force=False):
+        self.calls.append(token)
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return {'access_token': 'b', 'expires_at': time.time() + 3600}
+
+
+@pytest.fixture
+def refresh_session(session, monkeypatch):
+    monkeypatch.setattr(tu, '_refreshes', {})
+    monkeypatch.setattr(tu, 'get_session_id', lambda: 'session-1')
+
+    def login(expires_in):
+        session['auth_context'] = tu.create_auth_context(
+            {**TOKEN, 'expires_at': time.time() + expires_in})
+        return session['auth_context']
+
+    return login
+
+
+def test_refresh_started_once_per_session(refresh_session, session):
+    auth_context = refresh_session(tu.TOKEN_REFRESH_AHEAD - 10)
+    authenticator = FakeAuthenticator()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        tu.refresh_session_token(authenticator))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [True] * 8
+    assert len(authenticator.calls) == 1
+
+    authenticator.release.set()
+    tu._refreshes['session-1'].result(5)
+    assert tu.refresh_session_token(authenticator)
+    assert session['auth_context'].handle == auth_context.handle
+    assert session['auth_context'].expires_at > auth_context.expires_at
+    assert tu.get_session_token()['refresh_token'] == TOKEN['refresh_token']
+    assert len(authenticator.calls) == 1
+
+
+def test_refresh_not_started_early(refresh_session):
+    refresh_session(tu.TOKEN_REFRESH_AHEAD + 60)
+    authenticator = FakeAuthenticator()
+
+    assert tu.refresh_session_token(authenticator)
+    assert authenticator.calls == []
+    assert tu._refreshes == {}
+
+
+def test_failed_refresh_of_expired_token(refresh_session):
+    refresh_session(-1)
+    authenticator = FakeAuthenticator(error=RuntimeError('invalid_grant'))
+    authenticator.release.set()
+
+    assert not tu.refresh_session_token(authenticator)
+    assert len(authenticator.calls) == 1
+    assert tu._refreshes == {}
+
+
+def test_timed_out_refresh_not_submitted_again(refresh_session, session,
+                                               monkeypatch):
+    refresh_session(-1)
+    monkeypatch.setattr(tu, 'TOKEN_REFRESH_TIMEOUT', 0.05)
+    authenticator = FakeAuthenticator()
+
+    assert not tu.refresh_session_token(authenticator)
+    assert not tu.refresh_session_token(authenticator)
+    assert len(authenticator.calls) == 1
+
+    authenticator.release.set()
+    tu._refreshes['session-1'].result(5)
+    assert tu.refresh_session_token(authenticator)
+    assert len(authenticator.calls) == 1
+    assert tu._refreshes == {}
@@ -0,0 +1,73 @@
+# test_user_utils.py 
+# Description: A Streamlit authentication demonstration application
+# Copyright 2024 Michael Konrad 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# Date: 2026-10-18
+
+import pytest
+import time
+
+from authnyc import store_utils as su
+from authnyc import user_utils as uu
+
+
+def test_user_claims_read_like_a_record():
+    user_claims = uu.UserClaims.from_claims({
+        'sub': 'auth0|a', 'email': 'a@example.com', 'amr': ['mfa'],
+        'iss': 'https://tenant.example.com/'})
+
+    assert user_claims['email'] == 'a@example.com'
+    assert user_claims['name'] == ''
+    assert user_claims.amr == ('mfa',)
+    assert user_claims.get('iss') is None
+    with pytest.raises(KeyError):
+        user_claims['iss']
+    assert not hasattr(user_claims, '__dict__')
+    assert uu.get_claims_data({'amr': ['pwd']})['amr'] == ['pwd']
+
+
+def test_claims_cache_expires_and_evicts(monkeypatch):
+    monkeypatch.setattr(uu, '_claims_cache', uu.OrderedDict())
+    monkeypatch.setattr(uu, 'CLAIMS_CACHE_SIZE', 2)
+    user_claims = uu.UserClaims(sub='auth0|a')
+
+    uu.cache_claims('token-a', user_claims, time.time() + 60)
+    uu.cache_claims('token-expired', user_claims, time.time() - 1)
+    assert uu.get_cached_claims('token-a') is user_claims
+    assert uu.get_cached_claims('token-expired') is None
+
+    uu.cache_claims('token-b', user_claims, time.time() + 60)
+    uu.cache_claims('token-c', user_claims, time.time() + 60)
+    assert uu.get_cached_claims('token-a') is None
+    assert uu.get_cached_claims('token-c') is user_claims
+
+
+def test_unchanged_login_skips_store_write(monkeypatch, tmp_path):
+    user_db = su.SQLiteStore(str(tmp_path / 'users.db'), 'users',
+                             indexes=('email',))
+    writes = []
+    monkeypatch.setattr(user_db, 'update',
+                        lambda *args: writes.append(args))
+    monkeypatch.setattr(uu, 'get_user_db', lambda: user_db)
+    claims = {'sub': 'auth0|a', 'email': 'a@example.com', 'name': 'A'}
+    skipped = uu.SKIPPED_WRITES.values.get(('user',), 0)
+
+    uu.adduser('id-token', claims)
+    assert user_db.find('email', 'a@example.com') is not None
+    uu.adduser('id-token', claims)
+    assert writes == []
+    assert uu.SKIPPED_WRITES.values[('user',)] == skipped + 1
+
+    uu.adduser('id-token', {**claims, 'name': 'B'})
+    assert len(writes) == 1
+    assert uu.SKIPPED_WRITES.values[('user',)] == skipped + 1
@@ -0,0 +1,90 @@
+# test_warmup_utils.py 
+# Description: A Streamlit authentication demonstration application
+# Copyright 2024 Michael Konrad 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# Date: 2026-10-18
+
+import json
+import threading
+import time
+
+from authnyc import warmup_utils as wu
+
+
+def test_warm_up_retries_stages_and_marks_ready(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(wu, '_ready', False)
+    monkeypatch.setattr(wu, 'WARM_UP_RETRY_DELAY', 0)
+    failures = [RuntimeError('provider down')]
+
+    def discovery():
+        if failures:
+            raise failures.pop()
+
+    monkeypatch.setattr(wu, 'get_warm_up_stages',
+                        lambda: [('stores', lambda: None),
+                                 ('discovery', discovery)])
+    assert not wu.check_ready()
+
+    stages = wu.warm_up()
+
+    assert stages['stores']['error'] is None
+    assert stages['discovery']['error'] is None
+    assert wu.is_ready() and wu.check_ready()
+    ready = json.loads((tmp_path / wu.READY_FILE).read_text())
+    assert set(ready['stages']) == {'stores', 'discovery'}
+
+
+def test_failed_warm_up_is_not_ready(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(wu, '_ready', False)
+    monkeypatch.setattr(wu, 'WARM_UP_RETRY_DELAY', 0)
+    attempts = []
+
+    def fail():
+        attempts.append(1)
+        raise RuntimeError('provider down')
+
+    monkeypatch.setattr(wu, 'get_warm_up_stages',
+                        lambda: [('stores', lambda: None), ('discovery', fail)])
+
+    stages = wu.warm_up(attempts=3)
+
+    assert 'provider down' in stages['discovery']['error']
+    assert len(attempts) == 3
+    assert not wu.is_ready() and not wu.check_ready()
+
+
+def test_start_warm_up_runs_once_in_background(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(wu, '_ready', False)
+    monkeypatch.setattr(wu, '_warm_up_started', False)
+    release = threading.Event()
+    runs = []
+
+    def stage():
+        runs.append(threading.current_thread().name)
+        release.wait(5)
+
+    monkeypatch.setattr(wu, 'get_warm_up_stages', lambda: [('stage', stage)])
+
+    wu.start_warm_up()
+    wu.start_warm_up()
+    assert not wu.is_ready()
+
+    release.set()
+    ended = time.monotonic() + 5
+    while not wu.is_ready() and time.monotonic() < ended:
+        time.sleep(0.01)
+    assert wu.is_ready()
+    assert runs == ['warm-up']